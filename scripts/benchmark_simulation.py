@@ -0,0 +1,106 @@
+"""
+Benchmark de la simulation des lignes de commande
+Compare l'ancienne boucle iterrows + random.Random(OrderID) à simulate_order_details (NumPy)
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from extract import simulate_order_details
+
+
+def simulate_order_details_loop(orders, products):
+    """Implémentation historique (une instance random.Random par commande, une ligne à la fois)"""
+    product_list = products.to_dict('records')
+    order_details_list = []
+    for idx, order in orders.iterrows():
+        rng = random.Random(int(order['OrderID']))
+        n_products = rng.randint(1, 3)
+        for i in range(n_products):
+            product = product_list[rng.randrange(len(product_list))]
+            quantity = rng.randint(1, 10)
+            discount = rng.choice([0, 0.05, 0.1, 0.15])
+            order_details_list.append({
+                'OrderID': order['OrderID'],
+                'ProductID': product['ProductID'],
+                'ProductName': product['ProductName'],
+                'CategoryName': product['CategoryName'],
+                'UnitPrice': product['UnitPrice'],
+                'Quantity': quantity,
+                'Discount': discount,
+                'LineTotal': product['UnitPrice'] * quantity * (1 - discount)
+            })
+    return pd.DataFrame(order_details_list)
+
+
+def build_products(n_products=45):
+    """Catalogue synthétique de la taille de Products.xlsx"""
+    return pd.DataFrame({
+        'ProductID': np.arange(1, n_products + 1),
+        'ProductName': [f"Product {i}" for i in range(1, n_products + 1)],
+        'CategoryName': [f"Category {i % 8}" for i in range(n_products)],
+        'UnitPrice': np.round(np.linspace(1.0, 80.0, n_products), 2)
+    })
+
+
+def lines_per_order(details):
+    """Proportion des commandes ayant 1, 2, 3... lignes"""
+    return details.groupby('OrderID').size().value_counts(normalize=True).sort_index()
+
+
+def compare_lines_per_order(loop_details, numpy_details, n_orders, sigmas=4.0):
+    """Vérifie que les deux implémentations donnent la même distribution du nombre de lignes par
+    commande: mêmes valeurs possibles, et proportions égales à `sigmas` écarts-types près (les deux
+    générateurs diffèrent, seule la loi est comparée)"""
+    loop_share, numpy_share = lines_per_order(loop_details), lines_per_order(numpy_details)
+    shares = pd.DataFrame({'boucle': loop_share, 'NumPy': numpy_share}).fillna(0.0)
+    pooled = (shares['boucle'] + shares['NumPy']) / 2
+    tolerance = sigmas * np.sqrt(pooled * (1 - pooled) * 2 / n_orders)
+    same = set(loop_share.index) == set(numpy_share.index) and bool(
+        ((shares['boucle'] - shares['NumPy']).abs() <= tolerance).all())
+    detail = ', '.join(f"{n} ligne(s): {row['boucle']:.1%} / {row['NumPy']:.1%}" for n, row in shares.iterrows())
+    print(f"  {'✓' if same else '✗'} Lignes par commande (boucle / NumPy): {detail}")
+    return same
+
+
+def run_benchmark(n_orders, repeat=3):
+    """Mesure le débit (commandes/s) des deux implémentations"""
+    orders = pd.DataFrame({'OrderID': np.arange(1, n_orders + 1)})
+    products = build_products()
+
+    timings = {}
+    outputs = {}
+    for name, func in [('boucle iterrows', simulate_order_details_loop),
+                       ('NumPy vectorisé', simulate_order_details)]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if func is simulate_order_details:
+                details = func(orders['OrderID'], products)
+            else:
+                details = func(orders, products)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        outputs[name] = details
+        print(f"  • {name:<16} {best:>8.3f} s  ({n_orders / best:>12,.0f} commandes/s, {len(details):,} lignes)")
+
+    speedup = timings['boucle iterrows'] / timings['NumPy vectorisé']
+    print(f"  • Accélération: x{speedup:,.1f}")
+    compare_lines_per_order(outputs['boucle iterrows'], outputs['NumPy vectorisé'], n_orders)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la simulation des lignes de commande")
+    parser.add_argument("--orders", type=int, nargs='+', default=[1_000, 10_000, 100_000], help="Nombre de commandes simulées")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de répétitions (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    print("\n⏱ BENCHMARK SIMULATION DES LIGNES DE COMMANDE")
+    for n in args.orders:
+        print(f"\n{n:,} commandes:")
+        run_benchmark(n, repeat=args.repeat)
@@ -9,11 +9,22 @@ import plotly.express as px
 from dash import Dash, html, dcc, callback, Output, Input
 import os
 
+from dates import parse_dates
+from store import ProcessedStore
+
+# Colonnes de sales_clean utilisées par les graphiques (les autres ne sont pas chargées)
+SALES_COLUMNS = ['OrderID', 'OrderDate', 'ShippedDate', 'OrderYear', 'OrderMonth', 'WasShipped',
+                 'StatusName', 'EmployeeName', 'CustomerName', 'CustomerCompany']
+
 class NorthwindDashboard:
     """Classe pour créer le dashboard analytique"""
     
-    def __init__(self):
+    def __init__(self, years=None):
         self.processed_path = 'data/processed/'
+        # Données transformées en CSV ou Parquet (format détecté à la lecture)
+        self.store = ProcessedStore(self.processed_path)
+        # (optionnel) années de ventes à charger: en Parquet, seules ces partitions sont lues
+        self.years = years
         self.figures_path = 'figures/'
         os.makedirs(self.figures_path, exist_ok=True)
         
@@ -25,20 +36,28 @@ class NorthwindDashboard:
         print("📂 Chargement des données...")
         
         try:
-            self.sales = pd.read_csv(f"{self.processed_path}sales_clean.csv")
-            self.monthly = pd.read_csv(f"{self.processed_path}monthly_sales.csv")
-            self.categories = pd.read_csv(f"{self.processed_path}category_sales.csv")
-            self.products = pd.read_csv(f"{self.processed_path}top_products.csv")
-            self.countries = pd.read_csv(f"{self.processed_path}country_sales.csv")
-            self.employees = pd.read_csv(f"{self.processed_path}employee_sales.csv")
-            self.kpis = pd.read_csv(f"{self.processed_path}kpis.csv")
+            filters = [('Year', 'in', list(self.years))] if self.years else None
+            self.sales = self._read('sales_clean', columns=SALES_COLUMNS, filters=filters)
+            self.monthly = self._read('monthly_sales')
+            self.categories = self._read('category_sales')
+            self.products = self._read('top_products')
+            self.countries = self._read('country_sales')
+            self.employees = self._read('employee_sales')
+            self.kpis = self._read('kpis')
             
             # Convertir les dates
-            self.sales['OrderDate'] = pd.to_datetime(self.sales['OrderDate'])
+            self.sales['OrderDate'] = parse_dates(self.sales['OrderDate'])
             
             print("✓ Données chargées avec succès")
         except Exception as e:
             print(f"✗ Erreur: {e}")
+
+    def _read(self, name, columns=None, filters=None):
+        """Lit un jeu de data/processed/ (CSV ou Parquet); erreur explicite s'il est absent"""
+        df = self.store.read(name, columns=columns, filters=filters)
+        if df is None:
+            raise FileNotFoundError(f"{self.processed_path}{name}.csv / .parquet introuvable")
+        return df
     
     def load_all_data(self):
         """Charge TOUTES les données transformées"""
@@ -46,21 +65,21 @@ class NorthwindDashboard:
 
         try:
             # Données principales
-            self.sales = pd.read_csv(f"{self.processed_path}sales_enriched.csv")
-            self.monthly = pd.read_csv(f"{self.processed_path}metrics_monthly_sales.csv")
-            self.categories = pd.read_csv(f"{self.processed_path}metrics_category_sales.csv")
-            self.countries = pd.read_csv(f"{self.processed_path}metrics_country_sales.csv")
-            self.kpis = pd.read_csv(f"{self.processed_path}metrics_kpis_extended.csv")
+            self.sales = self._read('sales_enriched')
+            self.monthly = self._read('metrics_monthly_sales')
+            self.categories = self._read('metrics_category_sales')
+            self.countries = self._read('metrics_country_sales')
+            self.kpis = self._read('metrics_kpis_extended')
             
             # Nouvelles données
-            self.suppliers = pd.read_csv(f"{self.processed_path}metrics_supplier_by_products.csv")
-            self.inventory = pd.read_csv(f"{self.processed_path}inventory_stock.csv")
-            self.payments = pd.read_csv(f"{self.processed_path}metrics_payment_analysis.csv")
-            self.shippers = pd.read_csv(f"{self.processed_path}metrics_shipper_performance.csv")
+            self.suppliers = self._read('metrics_supplier_by_products')
+            self.inventory = self._read('inventory_stock')
+            self.payments = self._read('metrics_payment_analysis')
+            self.shippers = self._read('metrics_shipper_performance')
             
             # Convertir les dates
             if 'OrderDate' in self.sales.columns:
-                self.sales['OrderDate'] = pd.to_datetime(self.sales['OrderDate'])
+                self.sales['OrderDate'] = parse_dates(self.sales['OrderDate'])
             
             print("✓ TOUTES les données chargées avec succès")
             print(f"  • Ventes: {len(self.sales):,} lignes")
@@ -513,7 +532,7 @@ class NorthwindDashboard:
 
         # Ensure date column
         if 'OrderDate' in df.columns:
-            df['OrderDate'] = pd.to_datetime(df['OrderDate'], errors='coerce')
+            df['OrderDate'] = parse_dates(df['OrderDate'])
         else:
             # fallback to Year/Month (first day of month)
             if 'OrderYear' in df.columns and 'OrderMonth' in df.columns:
@@ -528,7 +547,7 @@ class NorthwindDashboard:
         else:
             df['Delivered'] = False
             if 'ShippedDate' in df.columns:
-                df['ShippedDate'] = pd.to_datetime(df['ShippedDate'], errors='coerce')
+                df['ShippedDate'] = parse_dates(df['ShippedDate'])
                 df.loc[df['ShippedDate'].notna(), 'Delivered'] = True
 
         # StatusName can override and mark as delivered when applicable
@@ -542,12 +561,12 @@ class NorthwindDashboard:
 
         # Aggregate by date + employee + delivered flag
         if 'OrderID' in df.columns:
-            agg = df.groupby([df['OrderDate'].dt.date, 'EmployeeName', 'Delivered']).agg(
+            agg = df.groupby([df['OrderDate'].dt.date, 'EmployeeName', 'Delivered'], observed=True).agg(
                 Orders=('OrderID', 'nunique'),
                 Customers=('CustomerName', lambda s: ', '.join(sorted(s.dropna().unique())[:3]))
             ).reset_index()
         else:
-            agg = df.groupby([df['OrderDate'].dt.date, 'EmployeeName', 'Delivered']).agg(
+            agg = df.groupby([df['OrderDate'].dt.date, 'EmployeeName', 'Delivered'], observed=True).agg(
                 Orders=('CustomerName', 'size'),
                 Customers=('CustomerName', lambda s: ', '.join(sorted(s.dropna().unique())[:3]))
             ).reset_index()
@@ -761,14 +780,14 @@ class NorthwindDashboard:
         app.run(debug=debug, port=port, use_reloader=False)
 
 
-def main():
-    """Fonction principale"""
+def main(years=None):
+    """Fonction principale (`years`: années de ventes à charger, toutes par défaut)"""
     print("\n" + "="*60)
     print("CRÉATION DU TABLEAU DE BORD NORTHWIND")
     print("="*60 + "\n")
     
     # Créer le dashboard
-    dashboard = NorthwindDashboard()
+    dashboard = NorthwindDashboard(years=years)
     
     # Sauvegarder les graphiques statiques
     # dashboard.save_static_charts()  # Décommenter si plotly-kaleido est installé
@@ -778,4 +797,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Tableau de bord Northwind")
+    parser.add_argument("--years", type=int, nargs='+', default=None,
+                        help="Ne charger que les ventes de ces années (partitions Year en Parquet)")
+    args = parser.parse_args()
+    main(years=args.years)
\ No newline at end of file
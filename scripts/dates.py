@@ -0,0 +1,105 @@
+"""
+Analyse des colonnes de dates, partagée par le transformateur, le schéma et le dashboard
+Le format est détecté une fois par source et chaque chaîne distincte n'est analysée qu'une fois
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Formats essayés, dans l'ordre, sur un échantillon des valeurs d'une source
+CANDIDATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+]
+
+
+class DateParser:
+    """Analyse de dates avec format détecté par source et cache des chaînes déjà analysées.
+
+    Les dates de commande se répètent beaucoup: seules les valeurs distinctes sont analysées
+    (pd.factorize), et le résultat est conservé d'un appel à l'autre (ex: lots successifs
+    d'un même fichier). Le format détecté pour une source est réutilisé tant qu'il analyse
+    toutes les nouvelles valeurs, sinon il est détecté à nouveau. Sans format unique, l'analyse
+    retombe sur ISO8601 puis sur une analyse valeur par valeur (valeurs invalides -> NaT).
+    """
+
+    def __init__(self, sample_size=200, max_cache_size=500_000):
+        self.sample_size = sample_size
+        self.max_cache_size = max_cache_size
+        self.formats = {}   # source -> format détecté (None: pas de format unique)
+        self.cache = {}     # source -> {chaîne: datetime64}
+
+    def detect_format(self, values):
+        """Premier format candidat qui analyse tout l'échantillon, ou None"""
+        sample = values[:self.sample_size]
+        for fmt in CANDIDATE_FORMATS:
+            try:
+                pd.to_datetime(sample, format=fmt)
+                return fmt
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    def _parse_values(self, values, source):
+        """Analyse des chaînes distinctes avec le format de la source (détecté si besoin)"""
+        known = self.formats.get(source)
+        # Format mémorisé d'abord; s'il ne convient plus, nouvelle détection sur ces valeurs
+        for fmt in ([known] if known else []) + [None]:
+            fmt = fmt or self.detect_format(values)
+            if fmt is None:
+                break
+            try:
+                parsed = pd.to_datetime(values, format=fmt)
+                self.formats[source] = fmt
+                return parsed
+            except (TypeError, ValueError):
+                continue
+        self.formats[source] = None
+        try:
+            return pd.to_datetime(values, format='ISO8601')
+        except (TypeError, ValueError):
+            return pd.to_datetime(values, errors='coerce', format='mixed')
+
+    def parse(self, series, source=None):
+        """Équivalent de pd.to_datetime(series, errors='coerce') pour une colonne de chaînes"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('object')
+        if series.dtype != object or pd.api.types.infer_dtype(series, skipna=True) != 'string':
+            # Colonne vide, numérique ou composée d'objets date
+            return pd.to_datetime(series, errors='coerce')
+
+        codes, uniques = pd.factorize(series)
+        if len(uniques) == 0:
+            return pd.Series(pd.NaT, index=series.index, name=series.name, dtype='datetime64[ns]')
+
+        cache = self.cache.setdefault(source, {})
+        missing = [value for value in uniques if value not in cache]
+        if missing:
+            if len(cache) + len(missing) > self.max_cache_size:
+                cache.clear()
+            parsed = self._parse_values(pd.Index(missing, dtype=object), source)
+            cache.update(zip(missing, parsed.to_numpy(dtype='datetime64[ns]')))
+
+        values = np.array([cache[value] for value in uniques], dtype='datetime64[ns]')
+        result = values[codes]
+        result[codes < 0] = np.datetime64('NaT')
+        return pd.Series(result, index=series.index, name=series.name)
+
+
+# Instance partagée: le format et le cache d'une source servent à tous les appels du processus
+DATE_PARSER = DateParser()
+
+
+def parse_dates(series, source=None):
+    """Analyse une colonne de dates avec l'analyseur partagé (source: clé du format/cache, ex: nom de colonne)"""
+    return DATE_PARSER.parse(series, source=source if source is not None else series.name)
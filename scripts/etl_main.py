@@ -1,18 +1,65 @@
 import argparse
-from extract import main as extract_main
+from extract import load_column_map, main as extract_main
 from transform import main as transform_data
 from load import main as load_to_sqlite
 
 
-def run_pipeline(source='excel', db_conn_string=None):
+def run_pipeline(source='excel', db_conn_string=None, in_memory=False, write_csv=True, use_cache=True, workers=1,
+                 chunksize=None, incremental=False, pool_size=None, transform_chunksize=None,
+                 reuse_imputation=False, incremental_metrics=False, store_format='csv', transform_workers=1,
+                 incremental_load=False, db_column_map=None):
+    """Exécute extract -> transform -> load.
+
+    Avec `in_memory=True`, les DataFrames passent directement d'une étape à l'autre au lieu
+    d'être relus depuis data/raw/ et data/processed/. `write_csv=False` (uniquement en mode
+    mémoire) supprime en plus l'écriture des CSV intermédiaires. `use_cache=False` ignore le
+    cache disque d'extraction (data/cache/). `workers` > 1 lit les sources en parallèle
+    (processus pour Excel, threads pour SQL; `pool_size` dimensionne alors le pool de connexions).
+    `chunksize` (source SQL) copie les tables brutes vers data/raw/ par lots. `incremental=True`
+    n'extrait que les commandes / transactions d'inventaire au-delà du dernier watermark.
+    `transform_chunksize` (hors mode mémoire) transforme data/raw/ par lots à mémoire bornée.
+    `reuse_imputation=True` réutilise les valeurs d'imputation persistées au lieu de les ré-ajuster.
+    `incremental_metrics=True` met à jour l'état persisté des agrégats avec les seules nouvelles commandes.
+    `store_format='parquet'` écrit data/processed/ en Parquet (sales_clean partitionné par Year/Month),
+    relu par le chargement et le dashboard à la place des CSV.
+    `transform_workers` > 1 nettoie et agrège la vue des ventes par partitions dans un process pool.
+    `incremental_load=True` n'écrit dans la base que les lignes nouvelles / modifiées (upsert).
+    `db_column_map` (source SQL) limite la lecture de certaines tables aux colonnes listées.
+    """
+    if not in_memory:
+        write_csv = True
+
     print("\n=== STEP 1 — EXTRACT ===")
-    extract_main(source=source, db_conn_string=db_conn_string)
+    extracted = extract_main(source=source, db_conn_string=db_conn_string, write_csv=write_csv, use_cache=use_cache,
+                             workers=workers, chunksize=chunksize, incremental=incremental,
+                             pool_size=pool_size, db_column_map=db_column_map)
 
     print("\n=== STEP 2 — TRANSFORM ===")
-    transform_data()
+    if in_memory:
+        # La vue extraite n'est plus utilisée après la transformation: nettoyage sans copie défensive
+        sales_clean, metrics = transform_data(sales_df=extracted.get('sales_analysis'), write_csv=write_csv,
+                                            inplace=True, reuse_imputation=reuse_imputation,
+                                            incremental_metrics=incremental_metrics, output_format=store_format,
+                                            workers=transform_workers)
+    else:
+        transform_data(chunksize=transform_chunksize, reuse_imputation=reuse_imputation,
+                       incremental_metrics=incremental_metrics, output_format=store_format,
+                       workers=transform_workers)
 
     print("\n=== STEP 3 — LOAD ===")
-    load_to_sqlite()
+    if in_memory:
+        if sales_clean is None:
+            print("[✘] Transformation sans résultat, chargement annulé")
+            return
+        inventory = extracted.get('inventory_analysis') or {}
+        load_to_sqlite(data={
+            'sales_clean': sales_clean,
+            'supplier_products': extracted.get('supplier_products'),
+            'inventory_stock_daily': inventory.get('stock_daily'),
+            **metrics
+        }, incremental=incremental_load)
+    else:
+        load_to_sqlite(incremental=incremental_load)
 
     print("[✔] ETL Pipeline finished successfully!")
 
@@ -21,6 +68,39 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run full ETL pipeline (choose source)')
     parser.add_argument('--source', choices=['excel','sql'], default='excel', help="Source des données: 'excel' or 'sql'")
     parser.add_argument('--db-conn', dest='db_conn', default=None, help='SQLAlchemy connection string when using --source sql')
+    parser.add_argument('--in-memory', dest='in_memory', action='store_true', help='Passer les DataFrames entre les étapes sans relire les CSV')
+    parser.add_argument('--no-csv', dest='no_csv', action='store_true', help="Avec --in-memory: ne pas écrire les CSV de data/raw/ et data/processed/")
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true', help="Ignorer le cache disque d'extraction data/cache/")
+    parser.add_argument('--workers', type=int, default=1, help="Nombre de processus (Excel) ou de threads (SQL) pour lire les sources en parallèle")
+    parser.add_argument('--pool-size', dest='pool_size', type=int, default=None, help="Taille du pool de connexions SQL (défaut: max(5, workers))")
+    parser.add_argument('--chunksize', type=int, default=None, help="Avec --source sql: copier les tables vers data/raw/ par lots de N lignes")
+    parser.add_argument('--incremental', action='store_true', help="N'extraire que les commandes / transactions d'inventaire nouvelles ou modifiées")
+    parser.add_argument('--transform-chunksize', dest='transform_chunksize', type=int, default=None,
+                        help="Transformer le CSV brut par lots de N lignes (mémoire bornée, incompatible avec --in-memory)")
+    parser.add_argument('--reuse-imputation', dest='reuse_imputation', action='store_true',
+                        help="Réutiliser les valeurs d'imputation persistées (data/state/imputation.json)")
+    parser.add_argument('--incremental-metrics', dest='incremental_metrics', action='store_true',
+                        help="Mettre à jour l'état persisté des agrégats (data/state/) avec les seules nouvelles commandes")
+    parser.add_argument('--store-format', dest='store_format', choices=['csv', 'parquet'], default='csv',
+                        help="Format de data/processed/ (parquet: sales_clean partitionné par Year/Month)")
+    parser.add_argument('--transform-workers', dest='transform_workers', type=int, default=1,
+                        help="Nettoyer et agréger la vue des ventes en N partitions parallèles (incompatible avec --transform-chunksize)")
+    parser.add_argument('--incremental-load', dest='incremental_load', action='store_true',
+                        help="Charger dans SQLite les seules lignes nouvelles / modifiées (upsert sur OrderID, ProductID)")
+    parser.add_argument('--db-columns', dest='db_columns', default=None,
+                        help="Avec --source sql: colonnes à lire par table, JSON {\"orders\": [\"Order ID\", ...]} ou chemin d'un fichier JSON")
     args = parser.parse_args()
+    if args.no_csv and not args.in_memory:
+        parser.error('--no-csv requiert --in-memory')
+    if args.transform_chunksize and args.in_memory:
+        parser.error('--transform-chunksize est incompatible avec --in-memory')
+    if args.transform_workers > 1 and args.transform_chunksize:
+        parser.error('--transform-workers est incompatible avec --transform-chunksize')
 
-    run_pipeline(source=args.source, db_conn_string=args.db_conn)
+    run_pipeline(source=args.source, db_conn_string=args.db_conn, in_memory=args.in_memory, write_csv=not args.no_csv,
+                 use_cache=not args.no_cache, workers=args.workers, chunksize=args.chunksize,
+                 incremental=args.incremental, pool_size=args.pool_size,
+                 transform_chunksize=args.transform_chunksize, reuse_imputation=args.reuse_imputation,
+                 incremental_metrics=args.incremental_metrics, store_format=args.store_format,
+                 transform_workers=args.transform_workers, incremental_load=args.incremental_load,
+                 db_column_map=load_column_map(args.db_columns))
@@ -4,27 +4,326 @@ Charge les données dans une base de données ou génère des fichiers finaux
 """
 
 import pandas as pd
+import numpy as np
 import sqlite3
 import os
+import shutil
+import itertools
+import time
 from datetime import datetime
 
+from schema import apply_schema_with_report, category_columns
+from store import ProcessedStore, clear_pending_orders, read_pending_orders
+from transform import METRIC_DEFINITIONS
+
+# PRAGMAs du chargement en masse (rétablis ensuite): pas de fsync ni de journal sur disque.
+# Un arrêt brutal pendant le chargement impose de recharger la base. (temp_store n'y figure pas:
+# le modifier supprime les tables temporaires, dont temp.sales_touched.)
+BULK_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'cache_size': '-262144',  # 256 Mo
+}
+
+
+def sqlite_type(dtype):
+    """Type SQLite d'une colonne pandas (mêmes affinités que DataFrame.to_sql)"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'TEXT'
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def table_ddl(table_name, df):
+    """CREATE TABLE explicite à partir des types des colonnes (schéma déjà appliqué pour sales_clean)"""
+    columns = ',\n    '.join(f'"{col}" {sqlite_type(df[col].dtype)}' for col in df.columns)
+    return f'CREATE TABLE "{table_name}" (\n    {columns}\n)'
+
+
+def sql_column_values(series):
+    """Valeurs d'une colonne prêtes pour sqlite3 (liste Python, valeurs manquantes -> None).
+
+    Catégories et dates ne sont converties qu'une fois par valeur distincte; les dates sont
+    écrites comme par to_sql ('AAAA-MM-JJ HH:MM:SS'). Les NaN des colonnes float sont transmis
+    tels quels: SQLite les enregistre comme NULL.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = np.append(series.cat.categories.to_numpy(dtype=object), None)  # code -1 -> None
+        return values[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        codes, uniques = pd.factorize(series)
+        values = np.append(uniques.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object), None)
+        return values[codes].tolist()
+    if pd.api.types.is_float_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.to_numpy().tolist()
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        values = series.to_numpy(dtype='int64', na_value=0).tolist()
+    else:
+        values = series.to_numpy(dtype=object).tolist()
+    for i in np.flatnonzero(missing):
+        values[i] = None
+    return values
+
+
+# Clé naturelle des lignes de sales_clean. Un même produit peut apparaître sur plusieurs lignes
+# d'une commande: LineSeq (rang de la ligne parmi celles de même clé) complète la clé unique.
+SALES_KEY = ['OrderID', 'ProductID']
+SALES_ROW_COLUMNS = ['LineSeq', 'RowHash']
+
+# Clé des tables de métriques (une ligne par groupe; kpis n'a qu'une ligne, sans clé)
+METRIC_KEYS = {name: definition['labels'] for name, definition in METRIC_DEFINITIONS.items()}
+
+
+# Vues de synthèse matérialisées: la table interne `table` porte les agrégats (clé de regroupement,
+# mesures, index couvrants des requêtes de classement); la vue publique garde son nom, ses colonnes
+# et son ORDER BY (`order`) d'origine, en simple SELECT sur la table
+SUMMARY_TABLES = {
+    'v_sales_summary': {
+        'table': 'mv_sales_summary',
+        'key': ['Year', 'Month'],
+        'measures': """COUNT(DISTINCT OrderID) as TotalOrders,
+                    COUNT(DISTINCT CustomerID) as TotalCustomers,
+                    SUM(LineTotal) as TotalRevenue,
+                    AVG(LineTotal) as AvgLineValue""",
+        'order': 'Year, Month',
+        'indexes': [],
+    },
+    'v_product_performance': {
+        'table': 'mv_product_performance',
+        'key': ['ProductName', 'CategoryName'],
+        'measures': """COUNT(DISTINCT OrderID) as NumOrders,
+                    SUM(Quantity) as TotalQuantity,
+                    SUM(LineTotal) as TotalRevenue,
+                    AVG(LineTotal) as AvgRevenue""",
+        'order': 'TotalRevenue DESC',
+        'indexes': [['TotalRevenue DESC', 'ProductName', 'CategoryName', 'NumOrders', 'TotalQuantity']],
+    },
+    'v_customer_segmentation': {
+        'table': 'mv_customer_segmentation',
+        'key': ['CustomerID', 'CustomerName', 'CustomerCountry'],
+        'measures': """COUNT(DISTINCT OrderID) as NumOrders,
+                    SUM(LineTotal) as TotalSpent,
+                    AVG(LineTotal) as AvgOrderValue,
+                    MAX(OrderDate) as LastOrderDate""",
+        'order': 'TotalSpent DESC',
+        'indexes': [['TotalSpent DESC', 'CustomerID', 'CustomerName', 'CustomerCountry', 'NumOrders']],
+    },
+}
+
+# Colonnes de sales_clean dont dépendent les groupes des tables de synthèse
+SUMMARY_DIMENSIONS = list(dict.fromkeys(col for definition in SUMMARY_TABLES.values() for col in definition['key']))
+
+
+# Profil qualité (historisé dans dq_profile): comptage exact des valeurs distinctes jusqu'à
+# PROFILE_EXACT_ROWS lignes, au-delà estimation sur un échantillon d'environ PROFILE_SAMPLE_ROWS
+# lignes lues par rowid (tirés avec une graine fixe: mêmes rowids d'un chargement à l'autre).
+# Seuils d'alerte par rapport au chargement précédent.
+PROFILE_TABLE = 'dq_profile'
+PROFILE_EXACT_ROWS = 50_000
+PROFILE_SAMPLE_ROWS = 32_768
+PROFILE_SAMPLE_SEED = 0
+NULL_RATE_TOLERANCE = 0.01      # hausse du taux de valeurs nulles (en points)
+DISTINCT_DROP_TOLERANCE = 0.5   # baisse relative du nombre de valeurs distinctes
+
+
+def estimate_distinct(sample, total, fraction):
+    """Estimation (Shlosser) du nombre de valeurs distinctes d'une colonne de `total` valeurs non
+    nulles, à partir d'un échantillon tiré avec la probabilité `fraction`.
+
+    Les valeurs vues une seule fois (f1) sont extrapolées selon la distribution des fréquences de
+    l'échantillon: une colonne quasi unique est estimée proche de `total`, une colonne à faible
+    cardinalité (toutes ses valeurs vues plusieurs fois) garde le nombre observé.
+    """
+    counts = sample.value_counts()
+    if counts.empty:
+        return 0
+    frequencies = counts.value_counts()  # i -> nombre de valeurs vues i fois
+    i, f = frequencies.index.to_numpy(dtype='float64'), frequencies.to_numpy(dtype='float64')
+    singletons = frequencies.get(1, 0)
+    denominator = np.sum(i * fraction * (1 - fraction) ** (i - 1) * f)
+    estimate = len(counts) + (singletons * np.sum((1 - fraction) ** i * f) / denominator if singletons else 0)
+    return int(min(round(estimate), total))
+
+
+def key_match(key, left, right):
+    """Condition de jointure sur les colonnes `key` (IS: une dimension NULL forme un groupe comme dans GROUP BY)"""
+    return ' AND '.join(f'{left}.{col} IS {right}.{col}' for col in key)
+
+
+def summary_select(definition, source='sales_clean'):
+    """Requête d'agrégation d'une table de synthèse sur `source` (sales_clean ou jointure restreinte)"""
+    key = ', '.join(f'sales_clean.{col}' for col in definition['key'])
+    return f"SELECT {key}, {definition['measures']} FROM {source} GROUP BY {key}"
+
+
+def summary_indexes(definition):
+    """Index d'une table de synthèse: clé unique des groupes + index couvrants"""
+    table = definition['table']
+    yield f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_key ON {table}({', '.join(definition['key'])})"
+    for i, columns in enumerate(definition['indexes'], 1):
+        yield f"CREATE INDEX IF NOT EXISTS idx_{table}_{i} ON {table}({', '.join(columns)})"
+
+
+def sales_row_keys(df):
+    """Colonnes LineSeq et RowHash (empreinte 64 bits de la ligne et de son LineSeq) de sales_clean"""
+    line_seq = df.groupby(SALES_KEY, sort=False, observed=True, dropna=False).cumcount().to_numpy(dtype='int64')
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    # LineSeq entre dans l'empreinte: deux lignes identiques d'une commande ont des empreintes distinctes
+    row_hash = pd.util.hash_pandas_object(pd.DataFrame({'RowHash': row_hash, 'LineSeq': line_seq}), index=False)
+    return pd.DataFrame({'LineSeq': line_seq, 'RowHash': row_hash.to_numpy().view('int64')}, index=df.index)
+
+
+def _normalize_row(row):
+    """Ligne comparable à une ligne relue de SQLite (NaN -> None)"""
+    return tuple(None if isinstance(value, float) and value != value else value for value in row)
+
+
+def _remove_db(path):
+    """Supprime un fichier SQLite et ses fichiers annexes (journal, WAL)"""
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _keep_copy(src, dst):
+    """Place une copie de `src` en `dst` sans toucher à `src` (lien physique si possible)"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # déjà en place (rename entre deux liens du même fichier ne ferait rien)
+    tmp = f"{dst}.tmp"
+    _remove_db(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+# Windows refuse de remplacer un fichier ouvert (PermissionError): quelques essais espacés
+# laissent aux lecteurs (dashboard, Excel, outils SQL) le temps de fermer leur connexion
+REPLACE_ATTEMPTS = 5
+REPLACE_DELAY = 1.0
+
+
+def _replace_db(src, dst, attempts=REPLACE_ATTEMPTS, delay=REPLACE_DELAY):
+    """os.replace(src, dst), réessayé tant que la cible est verrouillée (Windows)"""
+    for attempt in range(1, attempts + 1):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == attempts:
+                raise
+            print(f"[WARN] {dst} verrouille, nouvel essai dans {delay:.0f} s ({attempt}/{attempts})")
+            time.sleep(delay)
+
+
 class NorthwindLoader:
-    """Classe pour charger les données transformées"""
+    """Classe pour charger les données transformées
+
+    Le chargement construit une base fantôme complète (`<base>.new`: tables, index, vues,
+    contrôles qualité) puis la publie par renommage atomique: les lecteurs de la base en place
+    ne voient jamais de tables à moitié chargées et ne sont pas bloqués par le chargement.
+    La génération remplacée est conservée en `<base>.prev` (voir rollback()).
+
+    Avec `incremental=True`, la base fantôme part d'une copie de la base en place et sales_clean
+    et les tables de métriques n'y reçoivent que les lignes nouvelles, modifiées ou supprimées.
+    """
     
-    def __init__(self, output_db='data/northwind_analytics.db'):
+    def __init__(self, output_db='data/northwind_analytics.db', incremental=False):
         self.processed_path = 'data/processed/'
+        # Données transformées en CSV ou Parquet (format détecté à la lecture)
+        self.store = ProcessedStore(self.processed_path)
+        self.raw_path = 'data/raw/'
         self.output_db = output_db
+        self.shadow_db = f"{output_db}.new"
+        self.previous_db = f"{output_db}.prev"
+        self.incremental = incremental
+        # Groupes touchés par le dernier upsert de sales_clean (table temporaire temp.sales_touched)
+        self.sales_touched = False
+        # Identifiant du chargement dans l'historique dq_profile (fixé à la connexion)
+        self.load_id = None
         self.conn = None
         
     def connect(self):
-        """Crée ou se connecte à la base de données analytique"""
+        """Crée la base fantôme à côté de la base analytique (vide, ou copie de celle-ci en mode incrémental)"""
         try:
-            self.conn = sqlite3.connect(self.output_db)
-            print(f"[OK] Connexion etablie a {self.output_db}")
+            os.makedirs(os.path.dirname(self.output_db) or '.', exist_ok=True)
+            _remove_db(self.shadow_db)  # reste d'un chargement interrompu
+            if self.incremental and os.path.exists(self.output_db):
+                # Copie séquentielle du fichier: pas de ré-insertion ni de reconstruction d'index
+                shutil.copyfile(self.output_db, self.shadow_db)
+            self.conn = sqlite3.connect(self.shadow_db)
+            self.load_id = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            print(f"[OK] Connexion etablie a {self.shadow_db} (base fantome)")
             return True
         except Exception as e:
             print(f"[ERR] Erreur de connexion: {e}")
             return False
+
+    def publish(self):
+        """Remplace atomiquement la base analytique par la base fantôme (connexion fermée).
+
+        L'ancienne base devient .prev (lien physique posé avant le renommage, promu en .prev
+        seulement si la publication réussit). Les connexions déjà ouvertes continuent de lire l'ancienne version,
+        les nouvelles ouvrent la nouvelle.
+
+        Sous Windows, le renommage échoue tant qu'un lecteur garde la base ouverte: il est
+        réessayé, puis la base fantôme est conservée pour être publiée plus tard (--publish).
+        """
+        if not os.path.exists(self.shadow_db):
+            print(f"[ERR] Aucune base fantome a publier: {self.shadow_db}")
+            return False
+        # .prev n'est remplacé qu'une fois la publication réussie
+        replaced = f"{self.output_db}.replaced"
+        try:
+            if os.path.exists(self.output_db):
+                _keep_copy(self.output_db, replaced)
+            _replace_db(self.shadow_db, self.output_db)
+            if os.path.exists(replaced):
+                os.replace(replaced, self.previous_db)
+            print(f"[OK] Base publiee: {self.output_db} (generation precedente: {self.previous_db})")
+            return True
+        except Exception as e:
+            _remove_db(replaced)
+            print(f"[ERR] Erreur de publication: {e}")
+            print(f"[WARN] Base fantome conservee: {self.shadow_db} "
+                  f"(fermez les connexions a {self.output_db} puis lancez: python scripts/load.py --publish)")
+            return False
+
+    def discard(self):
+        """Abandonne la base fantôme: la base analytique en place n'est pas modifiée"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+        _remove_db(self.shadow_db)
+        print(f"[WARN] Chargement abandonne, base conservee: {self.output_db}")
+
+    def rollback(self):
+        """Rétablit la génération précédente; la base remplacée devient à son tour .prev"""
+        if not os.path.exists(self.previous_db):
+            print(f"[ERR] Aucune generation precedente: {self.previous_db}")
+            return False
+        try:
+            replaced = f"{self.output_db}.rollback"
+            if os.path.exists(self.output_db):
+                _keep_copy(self.output_db, replaced)
+            _replace_db(self.previous_db, self.output_db)
+            if os.path.exists(replaced):
+                os.replace(replaced, self.previous_db)
+            print(f"[OK] Generation precedente retablie: {self.output_db}")
+            return True
+        except Exception as e:
+            # Base en place inchangée: la copie intermédiaire est inutile
+            _remove_db(f"{self.output_db}.rollback")
+            print(f"[ERR] Erreur de retour arriere: {e}")
+            print(f"[WARN] Base inchangee: {self.output_db} (generation precedente toujours en {self.previous_db})")
+            return False
     
     def load_to_database(self, df, table_name, if_exists='replace'):
         """
@@ -32,8 +331,10 @@ class NorthwindLoader:
         Args:
             df: DataFrame à charger
             table_name: Nom de la table de destination
-            if_exists: 'replace', 'append', ou 'fail'
+            if_exists: 'replace' (chargement en masse, voir bulk_load), 'append', ou 'fail'
         """
+        if if_exists == 'replace':
+            return self.bulk_load(df, table_name)
         try:
             df.to_sql(table_name, self.conn, if_exists=if_exists, index=False)
             print(f"[OK] Table {table_name}: {len(df)} lignes chargees")
@@ -41,6 +342,180 @@ class NorthwindLoader:
         except Exception as e:
             print(f"[ERR] Erreur chargement {table_name}: {e}")
             return False
+
+    def bulk_load(self, df, table_name, batch_size=100_000, extra=None):
+        """Remplace une table par chargement en masse.
+
+        La table est recréée depuis un DDL explicite (table_ddl), sans index, puis remplie par
+        executemany en lots de `batch_size` lignes. Suppression, création et insertions forment une
+        seule transaction: en cas d'erreur, l'ancienne table est conservée. `extra` (optionnel):
+        colonnes ajoutées après celles de `df`, sans copier `df`.
+        """
+        columns = [df[col] for col in df.columns] + ([extra[col] for col in extra.columns] if extra is not None else [])
+        ddl = table_ddl(table_name, df if extra is None else pd.DataFrame({c.name: c.iloc[:0] for c in columns}))
+        insert = f'INSERT INTO "{table_name}" VALUES ({", ".join("?" * len(columns))})'
+        cursor = self.conn.cursor()
+        try:
+            rows = zip(*(sql_column_values(col) for col in columns))
+            cursor.execute("BEGIN")
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            cursor.execute(ddl)
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(insert, batch)
+            self.conn.commit()
+            print(f"[OK] Table {table_name}: {len(df)} lignes chargees")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"[ERR] Erreur chargement {table_name}: {e}")
+            return False
+
+    def table_columns(self, table_name):
+        """Colonnes d'une table de la base ([] si elle n'existe pas)"""
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+    def _upsert_rows(self, cursor, table_name, columns, key, rows):
+        """INSERT ... ON CONFLICT(key) DO UPDATE (index unique sur `key` requis)"""
+        names = ', '.join(f'"{col}"' for col in columns)
+        conflict = ', '.join(f'"{col}"' for col in key)
+        updates = ', '.join(f'"{col}" = excluded."{col}"' for col in columns if col not in key)
+        cursor.executemany(f'INSERT INTO "{table_name}" ({names}) VALUES ({", ".join("?" * len(columns))}) '
+                           f'ON CONFLICT({conflict}) DO UPDATE SET {updates}', rows)
+
+    def _delete_rows(self, cursor, table_name, key, keys):
+        """Supprime les lignes dont la clé est dans `keys`"""
+        cursor.executemany(f'DELETE FROM "{table_name}" WHERE ' + ' AND '.join(f'"{col}" = ?' for col in key), keys)
+
+    def upsert_sales_clean(self, df):
+        """Chargement incrémental de sales_clean: seules les lignes nouvelles, modifiées ou disparues sont écrites.
+
+        Les lignes sont comparées à la base par leur empreinte RowHash (lue depuis son index, sans
+        parcourir la table): celles dont l'empreinte est inconnue passent par INSERT ... ON CONFLICT
+        (OrderID, ProductID, LineSeq) DO UPDATE, puis les empreintes stockées qui n'existent plus
+        (lignes supprimées) sont effacées. Retourne None si un chargement complet est nécessaire
+        (table absente ou colonnes différentes, clé incomplète), sinon True / False.
+
+        Si l'extraction incrémentale a noté les commandes modifiées (read_pending_orders), seules
+        leurs lignes sont hachées et comparées: les empreintes stockées sont lues par l'index de la
+        clé (OrderID IN temp.delta_orders), pas pour toute la table. Une table jointe modifiée
+        (client, produit, facture...) ou une imputation ré-ajustée rend la liste inconnue: toutes
+        les lignes sont alors comparées.
+
+        Les dimensions des tables de synthèse des lignes écrites ou supprimées (avant et après
+        modification) sont conservées dans temp.sales_touched pour materialize_views().
+        """
+        columns = list(df.columns) + SALES_ROW_COLUMNS
+        if self.table_columns('sales_clean') != columns:
+            return None
+        if df[SALES_KEY].isna().any().any():
+            print("[WARN] sales_clean: cle (OrderID, ProductID) incomplete, chargement complet")
+            return None
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_sales_clean_key ON sales_clean(OrderID, ProductID, LineSeq)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_clean_rowhash ON sales_clean(RowHash)')
+            pending = read_pending_orders()
+            scope = 'sales_clean'
+            if pending is not None:
+                cursor.execute('DROP TABLE IF EXISTS temp.delta_orders')
+                cursor.execute('CREATE TEMP TABLE delta_orders (OrderID INTEGER PRIMARY KEY)')
+                cursor.executemany('INSERT INTO temp.delta_orders VALUES (?)', ((int(o),) for o in pending))
+                scope = 'sales_clean WHERE OrderID IN (SELECT OrderID FROM temp.delta_orders)'
+                n_total = len(df)
+                df = df[df['OrderID'].isin(pending)]
+                print(f"[INFO] sales_clean: {len(pending):,} commandes extraites depuis le dernier chargement "
+                      f"({len(df):,} lignes sur {n_total:,} comparees)")
+            stored = np.array([row[0] for row in cursor.execute(f'SELECT RowHash FROM {scope}')], dtype='int64')
+            row_keys = sales_row_keys(df)
+            incoming = row_keys['RowHash'].to_numpy()
+            positions = np.flatnonzero(~np.isin(incoming, stored))
+            obsolete = stored[~np.isin(stored, incoming)]
+            cursor.execute('DROP TABLE IF EXISTS temp.obsolete_rows')
+            cursor.execute('CREATE TEMP TABLE obsolete_rows (RowHash INTEGER)')
+            cursor.executemany('INSERT INTO temp.obsolete_rows VALUES (?)', [(h,) for h in obsolete.tolist()])
+            dimensions = ', '.join(SUMMARY_DIMENSIONS)
+            cursor.execute('DROP TABLE IF EXISTS temp.sales_touched')
+            cursor.execute(f'CREATE TEMP TABLE sales_touched AS SELECT {dimensions} FROM sales_clean '
+                           'WHERE RowHash IN (SELECT RowHash FROM temp.obsolete_rows)')
+
+            delta, delta_keys = df.iloc[positions], row_keys.iloc[positions]
+            rows = zip(*(sql_column_values(delta[col]) for col in df.columns),
+                       *(sql_column_values(delta_keys[col]) for col in SALES_ROW_COLUMNS))
+            self._upsert_rows(cursor, 'sales_clean', columns, SALES_KEY + ['LineSeq'], rows)
+            # Les lignes mises à jour ont déjà changé d'empreinte: il ne reste que les lignes disparues
+            cursor.execute('DELETE FROM sales_clean WHERE RowHash IN (SELECT RowHash FROM temp.obsolete_rows)')
+            n_deleted = cursor.rowcount
+            cursor.executemany(f'INSERT INTO temp.sales_touched VALUES ({", ".join("?" * len(SUMMARY_DIMENSIONS))})',
+                               zip(*(sql_column_values(delta[col]) for col in SUMMARY_DIMENSIONS)))
+            self.conn.commit()
+            self.sales_touched = True
+            n_updated = len(obsolete) - n_deleted
+            print(f"[OK] Table sales_clean: {len(positions) - n_updated} inserees, {n_updated} mises a jour, "
+                  f"{n_deleted} supprimees ({len(df) - len(positions)} inchangees)")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"[ERR] Erreur chargement incremental sales_clean: {e}")
+            return False
+
+    def upsert_table(self, df, table_name, key):
+        """Chargement incrémental d'une table de métriques (une ligne par valeur de `key`).
+
+        Les tables de métriques sont petites: elles sont relues et comparées ligne à ligne, seuls
+        les groupes dont une valeur a changé sont écrits (INSERT ... ON CONFLICT) et les groupes
+        disparus (ex: sortis du top 20) supprimés. Retourne None si un chargement complet est
+        nécessaire (table absente ou colonnes différentes), sinon True / False.
+        """
+        if not key or self.table_columns(table_name) != list(df.columns):
+            return None
+        columns = key + [col for col in df.columns if col not in key]
+        cursor = self.conn.cursor()
+        try:
+            names = ', '.join(f'"{col}"' for col in columns)
+            stored = {row[:len(key)]: row for row in cursor.execute(f'SELECT {names} FROM "{table_name}"')}
+            n_stored = len(stored)
+            changed = []
+            for row in map(_normalize_row, zip(*(sql_column_values(df[col]) for col in columns))):
+                if stored.pop(row[:len(key)], None) != row:
+                    changed.append(row)
+            cursor.execute("BEGIN")
+            key_names = ', '.join(f'"{col}"' for col in key)
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{table_name}_key" ON "{table_name}"({key_names})')
+            self._upsert_rows(cursor, table_name, columns, key, changed)
+            self._delete_rows(cursor, table_name, key, list(stored))
+            self.conn.commit()
+            print(f"[OK] Table {table_name}: {len(changed)} lignes ecrites, {len(stored)} supprimees "
+                  f"(sur {n_stored})")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"[ERR] Erreur chargement incremental {table_name}: {e}")
+            return False
+
+    def load_table(self, df, table_name):
+        """Charge une table transformée: upsert en mode incrémental si possible, sinon remplacement complet"""
+        if self.incremental:
+            if table_name == 'sales_clean':
+                result = self.upsert_sales_clean(df)
+            else:
+                result = self.upsert_table(df, table_name, METRIC_KEYS.get(table_name, []))
+            if result is not None:
+                return result
+        if table_name == 'sales_clean':
+            return self.bulk_load(df, table_name, extra=sales_row_keys(df))
+        return self.load_to_database(df, table_name)
+
+    def set_pragmas(self, pragmas):
+        """Applique des PRAGMAs et retourne leurs valeurs précédentes (pour les rétablir)"""
+        previous = {}
+        for name, value in pragmas.items():
+            previous[name] = self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+            self.conn.execute(f"PRAGMA {name} = {value}")
+        return previous
     
     def create_indexes(self):
         """Crée des index pour optimiser les requêtes"""
@@ -51,6 +526,18 @@ class NorthwindLoader:
             "CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales_clean(CustomerID)",
             "CREATE INDEX IF NOT EXISTS idx_sales_product ON sales_clean(ProductID)",
             "CREATE INDEX IF NOT EXISTS idx_sales_category ON sales_clean(CategoryName)",
+            # Recalcul des groupes touchés des tables de synthèse
+            "CREATE INDEX IF NOT EXISTS idx_sales_year_month ON sales_clean(Year, Month)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_product_name ON sales_clean(ProductName, CategoryName)",
+            "CREATE INDEX IF NOT EXISTS idx_supplier_products_supplier ON supplier_products(SupplierID)",
+            "CREATE INDEX IF NOT EXISTS idx_supplier_products_product ON supplier_products(ProductID)",
+            "CREATE INDEX IF NOT EXISTS idx_stock_daily_product ON inventory_stock_daily(ProductName, Date)",
+            # Clés uniques des chargements incrémentaux (INSERT ... ON CONFLICT)
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_sales_clean_key ON sales_clean(OrderID, ProductID, LineSeq)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_clean_rowhash ON sales_clean(RowHash)",
+        ] + [
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{table_name}_key ON {table_name}({', '.join(key)})"
+            for table_name, key in METRIC_KEYS.items()
         ]
         
         cursor = self.conn.cursor()
@@ -63,89 +550,129 @@ class NorthwindLoader:
         
         self.conn.commit()
     
-    def create_views(self):
-        """Crée des vues SQL pour faciliter l'analyse"""
-        print("\n[INFO] Creation des vues SQL...")
-        
-        views = {
-            'v_sales_summary': """
-                CREATE VIEW IF NOT EXISTS v_sales_summary AS
-                SELECT 
-                    Year,
-                    Month,
-                    COUNT(DISTINCT OrderID) as TotalOrders,
-                    COUNT(DISTINCT CustomerID) as TotalCustomers,
-                    SUM(LineTotal) as TotalRevenue,
-                    AVG(LineTotal) as AvgLineValue
-                FROM sales_clean
-                GROUP BY Year, Month
-                ORDER BY Year, Month
-            """,
-            
-            'v_product_performance': """
-                CREATE VIEW IF NOT EXISTS v_product_performance AS
-                SELECT 
-                    ProductName,
-                    CategoryName,
-                    COUNT(DISTINCT OrderID) as NumOrders,
-                    SUM(Quantity) as TotalQuantity,
-                    SUM(LineTotal) as TotalRevenue,
-                    AVG(LineTotal) as AvgRevenue
-                FROM sales_clean
-                GROUP BY ProductName, CategoryName
-                ORDER BY TotalRevenue DESC
-            """,
-            
-            'v_customer_segmentation': """
-                CREATE VIEW IF NOT EXISTS v_customer_segmentation AS
-                SELECT 
-                    CustomerID,
-                    CustomerName,
-                    CustomerCountry,
-                    COUNT(DISTINCT OrderID) as NumOrders,
-                    SUM(LineTotal) as TotalSpent,
-                    AVG(LineTotal) as AvgOrderValue,
-                    MAX(OrderDate) as LastOrderDate
-                FROM sales_clean
-                GROUP BY CustomerID, CustomerName, CustomerCountry
-                ORDER BY TotalSpent DESC
-            """
-        }
+    def materialize_views(self):
+        """Matérialise les vues de synthèse (SUMMARY_TABLES) en tables indexées.
+
+        Chaque vue publique devient un SELECT ... ORDER BY sur sa table interne. Après un upsert de
+        sales_clean, seuls les groupes touchés (temp.sales_touched) sont supprimés puis recalculés
+        depuis sales_clean. Une table est reconstruite entièrement après un chargement complet, si
+        elle n'existe pas encore, ou si la moitié de ses groupes sont touchés (un parcours complet
+        coûte alors moins que les accès par index).
+        """
+        print("\n[INFO] Materialisation des vues de synthese...")
         
         cursor = self.conn.cursor()
-        for view_name, view_query in views.items():
+        for name, definition in SUMMARY_TABLES.items():
+            table = definition['table']
             try:
-                cursor.execute(view_query)
-                print(f"  [OK] Vue {view_name} creee")
+                cursor.execute("BEGIN")
+                refreshed = None
+                exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                        (table,)).fetchone()
+                if self.sales_touched and exists:
+                    refreshed = self._refresh_summary(cursor, definition)
+                    message = f"{refreshed} groupes recalcules"
+                if refreshed is None:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                    cursor.execute(f"CREATE TABLE {table} AS {summary_select(definition)} ORDER BY {definition['order']}")
+                    message = "reconstruite"
+                for index_query in summary_indexes(definition):
+                    cursor.execute(index_query)
+                # Vue publique (une base antérieure peut contenir une vue SQL ou une table de ce nom)
+                row = cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+                if row:
+                    cursor.execute(f"DROP {row[0].upper()} {name}")
+                cursor.execute(f"CREATE VIEW {name} AS SELECT * FROM {table} ORDER BY {definition['order']}")
+                self.conn.commit()
+                print(f"  [OK] Vue {name} ({table} {message})")
             except Exception as e:
-                print(f"  [ERR] Erreur {view_name}: {e}")
-        
-        self.conn.commit()
+                self.conn.rollback()
+                print(f"  [ERR] Erreur {name}: {e}")
+
+    def _refresh_summary(self, cursor, definition):
+        """Recalcule les groupes de la table de synthèse présents dans temp.sales_touched; retourne
+        leur nombre, ou None (rien n'est modifié) si au moins la moitié des groupes sont touchés"""
+        name, key = definition['table'], definition['key']
+        cursor.execute('DROP TABLE IF EXISTS temp.summary_keys')
+        cursor.execute(f"CREATE TEMP TABLE summary_keys AS SELECT DISTINCT {', '.join(key)} FROM temp.sales_touched")
+        touched = cursor.execute("SELECT COUNT(*) FROM temp.summary_keys").fetchone()[0]
+        if touched and touched * 2 >= cursor.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]:
+            return None
+        cursor.execute(f"DELETE FROM {name} WHERE rowid IN "
+                       f"(SELECT {name}.rowid FROM temp.summary_keys k CROSS JOIN {name} ON {key_match(key, 'k', name)})")
+        # CROSS JOIN: parcours des seuls groupes touchés, lignes lues par les index de sales_clean
+        source = f"temp.summary_keys k CROSS JOIN sales_clean ON {key_match(key, 'k', 'sales_clean')}"
+        cursor.execute(f"INSERT INTO {name} " + summary_select(definition, source))
+        return touched
     
-    def load_all_data(self):
-        """Charge toutes les données transformées"""
+    def load_all_data(self, data=None):
+        """Charge toutes les données transformées
+
+        Args:
+            data: (optionnel) dict {nom_table: DataFrame} déjà en mémoire (ex: sortie du
+                transformateur). Si None, les fichiers (CSV ou Parquet) de data/processed/ sont lus.
+        """
         print("\n[INFO] Chargement des donnees transformees...\n")
+        previous_pragmas = self.set_pragmas(BULK_LOAD_PRAGMAS)
+        try:
+            return self._load_tables(data)
+        finally:
+            self.set_pragmas(previous_pragmas)
+
+    def _load_tables(self, data):
+        """Charge les tables de data/processed/ (ou de `data`) puis celles de data/raw/"""
         
-        # Liste des fichiers à charger
-        files_to_load = {
-            'sales_clean': 'sales_clean.csv',
-            'monthly_sales': 'monthly_sales.csv',
-            'category_sales': 'category_sales.csv',
-            'top_products': 'top_products.csv',
-            'country_sales': 'country_sales.csv',
-            'employee_sales': 'employee_sales.csv',
-            'kpis': 'kpis.csv'
-        }
+        # Jeux de données à charger
+        tables_to_load = [
+            'sales_clean',
+            'monthly_sales',
+            'category_sales',
+            'top_products',
+            'country_sales',
+            'employee_sales',
+            'kpis'
+        ]
         
         loaded_count = 0
         
-        for table_name, filename in files_to_load.items():
-            file_path = f"{self.processed_path}{filename}"
+        for table_name in tables_to_load:
+            if data is not None:
+                if data.get(table_name) is not None:
+                    self.load_table(data[table_name], table_name)
+                    loaded_count += 1
+                else:
+                    print(f"[WARN] Donnees absentes en memoire: {table_name}")
+            elif self.store.exists(table_name):
+                try:
+                    if table_name == 'sales_clean':
+                        # Lecture typée: catégories dès le parseur CSV (Parquet: types déjà stockés),
+                        # puis entiers réduits et dates
+                        df = self.store.read(table_name, dtype=category_columns())
+                        df = apply_schema_with_report(df, 'sales_clean')
+                    else:
+                        df = self.store.read(table_name)
+                    self.load_table(df, table_name)
+                    loaded_count += 1
+                except Exception as e:
+                    print(f"[ERR] Erreur chargement {table_name}: {e}")
+            else:
+                print(f"[WARN] Fichier non trouve: {table_name}")
+        
+        # Tables produites directement par l'extraction (dans data/raw/)
+        raw_files_to_load = {
+            'supplier_products': 'supplier_products.csv',
+            'inventory_stock_daily': 'inventory_stock_daily.csv'
+        }
+        
+        for table_name, filename in raw_files_to_load.items():
+            file_path = f"{self.raw_path}{filename}"
             
-            if os.path.exists(file_path):
+            if data is not None and data.get(table_name) is not None:
+                self.load_to_database(data[table_name], table_name)
+                loaded_count += 1
+            elif os.path.exists(file_path):
                 try:
-                    df = pd.read_csv(file_path)
-                    self.load_to_database(df, table_name)
+                    self.load_to_database(pd.read_csv(file_path), table_name)
                     loaded_count += 1
                 except Exception as e:
                     print(f"[ERR] Erreur chargement {filename}: {e}")
@@ -154,8 +681,8 @@ class NorthwindLoader:
         
         return loaded_count
     
-    def generate_excel_report(self):
-        """Génère un rapport Excel avec plusieurs onglets"""
+    def generate_excel_report(self, data=None):
+        """Génère un rapport Excel avec plusieurs onglets (depuis `data` si fourni, sinon data/processed/)"""
         print("\n[INFO] Generation du rapport Excel...")
         
         output_file = 'reports/rapport_northwind.xlsx'
@@ -165,18 +692,20 @@ class NorthwindLoader:
             with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
                 # Charger et écrire chaque dataset
                 datasets = {
-                    'KPIs': 'kpis.csv',
-                    'Ventes Mensuelles': 'monthly_sales.csv',
-                    'Par Catégorie': 'category_sales.csv',
-                    'Top Produits': 'top_products.csv',
-                    'Par Pays': 'country_sales.csv',
-                    'Employés': 'employee_sales.csv'
+                    'KPIs': 'kpis',
+                    'Ventes Mensuelles': 'monthly_sales',
+                    'Par Catégorie': 'category_sales',
+                    'Top Produits': 'top_products',
+                    'Par Pays': 'country_sales',
+                    'Employés': 'employee_sales'
                 }
                 
-                for sheet_name, filename in datasets.items():
-                    file_path = f"{self.processed_path}{filename}"
-                    if os.path.exists(file_path):
-                        df = pd.read_csv(file_path)
+                for sheet_name, key in datasets.items():
+                    if data is not None:
+                        df = data.get(key)
+                    else:
+                        df = self.store.read(key)
+                    if df is not None:
                         df.to_excel(writer, sheet_name=sheet_name, index=False)
                         print(f"  [OK] Onglet '{sheet_name}' ajoute")
             
@@ -187,39 +716,204 @@ class NorthwindLoader:
             print(f"[ERR] Erreur generation Excel: {e}")
             return False
     
+    def profile_table(self, table_name):
+        """Profil d'une table en un parcours: nombre de lignes, puis par colonne valeurs nulles,
+        valeurs distinctes, min et max. Au-delà de PROFILE_EXACT_ROWS lignes, les valeurs distinctes
+        sont estimées sur un échantillon lu par rowid (profile_sample), sans second parcours.
+
+        Returns:
+            liste de dicts (une ligne '*' pour la table, puis une par colonne)
+        """
+        columns = self.table_columns(table_name)
+        # MAX(rowid) (lu dans l'index de la table) majore le nombre de lignes: en dessous du seuil,
+        # les valeurs distinctes sont comptées dans le même parcours
+        max_rowid = self.conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"').fetchone()[0] or 0
+        counted = max_rowid <= PROFILE_EXACT_ROWS
+        aggregates = ['COUNT(*)']
+        for col in columns:
+            aggregates += [f'COUNT("{col}")', f'MIN("{col}")', f'MAX("{col}")']
+            if counted:
+                aggregates.append(f'COUNT(DISTINCT "{col}")')
+        values = iter(self.conn.execute(f'SELECT {", ".join(aggregates)} FROM "{table_name}"').fetchone())
+        n_rows = next(values)
+        stats = {}
+        for col in columns:
+            non_null, min_value, max_value = next(values), next(values), next(values)
+            stats[col] = (non_null, min_value, max_value, next(values) if counted else None)
+        # Le choix exact / estimé suit le nombre réel de lignes (rowids libérés par des suppressions)
+        exact = n_rows <= PROFILE_EXACT_ROWS
+        if exact and not counted:
+            counts = ', '.join(f'COUNT(DISTINCT "{col}")' for col in columns)
+            distinct = self.conn.execute(f'SELECT {counts} FROM "{table_name}"').fetchone()
+            stats = {col: stats[col][:3] + (count,) for col, count in zip(columns, distinct)}
+        elif not exact:
+            sample, fraction = self.profile_sample(table_name, n_rows, max_rowid)
+            for col in columns:
+                non_null, min_value, max_value, _ = stats[col]
+                stats[col] = (non_null, min_value, max_value, estimate_distinct(sample[col], non_null, fraction))
+
+        profile = [{'TableName': table_name, 'ColumnName': '*', 'RowCount': n_rows}]
+        for col, (non_null, min_value, max_value, distinct) in stats.items():
+            profile.append({'TableName': table_name, 'ColumnName': col, 'RowCount': n_rows,
+                            'NullCount': n_rows - non_null, 'DistinctCount': distinct,
+                            'DistinctExact': int(exact), 'MinValue': min_value, 'MaxValue': max_value})
+        return profile
+
+    def profile_sample(self, table_name, n_rows, max_rowid):
+        """Échantillon d'environ PROFILE_SAMPLE_ROWS lignes de `table_name`, lu par accès direct au
+        rowid (pas de parcours de la table).
+
+        Les rowids candidats sont tirés sans remise dans [1, max_rowid] avec une graine fixe; chaque
+        ligne existante est donc retenue avec la probabilité `fraction` = candidats / max_rowid.
+
+        Returns:
+            (DataFrame échantillon, fraction)
+        """
+        n_candidates = min(max_rowid, -(-PROFILE_SAMPLE_ROWS * max_rowid // max(n_rows, 1)))
+        rng = np.random.default_rng(PROFILE_SAMPLE_SEED)
+        rowids = np.sort(rng.choice(max_rowid, size=n_candidates, replace=False)) + 1
+        cursor = self.conn.cursor()
+        cursor.execute('DROP TABLE IF EXISTS temp.profile_rowids')
+        cursor.execute('CREATE TEMP TABLE profile_rowids (id INTEGER PRIMARY KEY)')
+        cursor.executemany('INSERT INTO temp.profile_rowids VALUES (?)', ((int(r),) for r in rowids))
+        try:
+            sample = pd.read_sql(f'SELECT t.* FROM temp.profile_rowids s CROSS JOIN "{table_name}" t '
+                                 f'ON t.rowid = s.id', self.conn)
+        finally:
+            cursor.execute('DROP TABLE temp.profile_rowids')
+            self.conn.commit()
+        return sample, n_candidates / max_rowid
+
+    def previous_profile(self):
+        """Profil du dernier chargement enregistré (repris de la base en place si la base fantôme
+        n'a pas encore d'historique); DataFrame vide s'il n'y en a pas"""
+        cursor = self.conn.cursor()
+        if not self.table_columns(PROFILE_TABLE) and os.path.exists(self.output_db):
+            cursor.execute("ATTACH DATABASE ? AS live", (self.output_db,))
+            try:
+                if cursor.execute("SELECT 1 FROM live.sqlite_master WHERE name = ?", (PROFILE_TABLE,)).fetchone():
+                    cursor.execute(f"CREATE TABLE {PROFILE_TABLE} AS SELECT * FROM live.{PROFILE_TABLE}")
+                    self.conn.commit()
+            finally:
+                cursor.execute("DETACH DATABASE live")
+        if not self.table_columns(PROFILE_TABLE):
+            return pd.DataFrame()
+        return pd.read_sql(f"SELECT * FROM {PROFILE_TABLE} WHERE LoadID = "
+                           f"(SELECT MAX(LoadID) FROM {PROFILE_TABLE} WHERE LoadID <> ?)", self.conn,
+                           params=(self.load_id,))
+
+    @staticmethod
+    def profile_regressions(profile, previous):
+        """Motifs d'alerte de chaque ligne du profil par rapport au profil précédent (None si aucun)"""
+        previous = {(row['TableName'], row['ColumnName']): row for row in previous.to_dict('records')}
+        current = {(row['TableName'], row['ColumnName']) for row in profile}
+        flags = []
+        for row in profile:
+            old = previous.get((row['TableName'], row['ColumnName']))
+            reasons = []
+            if old is not None and row['ColumnName'] == '*':
+                if row['RowCount'] < old['RowCount']:
+                    reasons.append(f"lignes {old['RowCount']:,} -> {row['RowCount']:,}")
+            elif old is not None:
+                old_rate = old['NullCount'] / old['RowCount'] if old['RowCount'] else 0
+                rate = row['NullCount'] / row['RowCount'] if row['RowCount'] else 0
+                if rate - old_rate > NULL_RATE_TOLERANCE:
+                    reasons.append(f"nulls {old_rate:.1%} -> {rate:.1%}")
+                if old['DistinctCount'] and row['DistinctCount'] < old['DistinctCount'] * (1 - DISTINCT_DROP_TOLERANCE):
+                    reasons.append(f"distinctes {int(old['DistinctCount']):,} -> {row['DistinctCount']:,}")
+            flags.append('; '.join(reasons) or None)
+        # Tables (ligne '*') et colonnes de tables présentes profilées au chargement précédent mais absentes
+        missing = [key for key in previous if key not in current and (key[1] == '*' or (key[0], '*') in current)]
+        return flags, missing
+
+    def save_profile(self, profile, flags):
+        """Ajoute le profil de ce chargement à l'historique dq_profile"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {PROFILE_TABLE} (
+                LoadID TIMESTAMP,
+                TableName TEXT,
+                ColumnName TEXT,
+                RowCount INTEGER,
+                NullCount INTEGER,
+                DistinctCount INTEGER,
+                DistinctExact INTEGER,
+                MinValue,
+                MaxValue,
+                Regression TEXT
+            )""")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{PROFILE_TABLE}_load ON {PROFILE_TABLE}(LoadID, TableName)")
+        cursor.executemany(f"INSERT INTO {PROFILE_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (self.load_id, row['TableName'], row['ColumnName'], row['RowCount'], row.get('NullCount'),
+             row.get('DistinctCount'), row.get('DistinctExact'), row.get('MinValue'), row.get('MaxValue'), flag)
+            for row, flag in zip(profile, flags)])
+        self.conn.commit()
+
     def verify_data_quality(self):
-        """Vérifie la qualité des données chargées"""
+        """Vérifie la qualité des données chargées.
+
+        Chaque table est profilée en un parcours (profile_table); le profil est historisé dans
+        dq_profile et comparé au chargement précédent. Retourne False si la base ne doit pas être
+        publiée (sales_clean absente ou vide, vue inutilisable); valeurs manquantes et régressions
+        ne sont que signalées.
+        """
         print("\n[INFO] Verification de la qualite des donnees...\n")
         
-        # Compter les enregistrements par table
         cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name <> ?",
+                       (PROFILE_TABLE,))
+        profile = []
+        for (table_name,) in cursor.fetchall():
+            profile.extend(self.profile_table(table_name))
         
         print("Nombre d'enregistrements par table:")
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
+        counts = {row['TableName']: row['RowCount'] for row in profile if row['ColumnName'] == '*'}
+        for table_name, count in counts.items():
             print(f"  - {table_name}: {count:,} lignes")
         
-        # Vérifier les valeurs nulles dans la table principale
-        cursor.execute("SELECT * FROM sales_clean LIMIT 1")
-        columns = [description[0] for description in cursor.description]
+        if not counts.get('sales_clean'):
+            print("\n[ERR] Table sales_clean absente ou vide")
+            return False
         
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='view'")
+        for (view_name,) in cursor.fetchall():
+            try:
+                cursor.execute(f"SELECT * FROM {view_name} LIMIT 1").fetchall()
+            except Exception as e:
+                print(f"\n[ERR] Vue {view_name} inutilisable: {e}")
+                return False
+        
+        # Valeurs nulles dans la table principale (profil)
         print("\nValeurs manquantes dans sales_clean:")
-        null_counts = []
-        for col in columns:
-            cursor.execute(f"SELECT COUNT(*) FROM sales_clean WHERE {col} IS NULL")
-            null_count = cursor.fetchone()[0]
-            if null_count > 0:
-                null_counts.append((col, null_count))
+        null_counts = [(row['ColumnName'], row['NullCount']) for row in profile
+                       if row['TableName'] == 'sales_clean' and row['ColumnName'] != '*' and row['NullCount'] > 0]
         
         if null_counts:
             for col, count in null_counts:
                 print(f"  [WARN] {col}: {count} valeurs nulles")
         else:
             print("  [OK] Aucune valeur manquante")
+        
+        # Comparaison avec le chargement précédent, puis historisation
+        try:
+            previous = self.previous_profile()
+            flags, missing = self.profile_regressions(profile, previous)
+            self.save_profile(profile, flags)
+        except Exception as e:
+            print(f"\n[WARN] Profil qualite non enregistre: {e}")
+            return True
+        
+        print(f"\nProfil qualite ({PROFILE_TABLE}, chargement {self.load_id}):")
+        if previous.empty:
+            print("  [INFO] Premier profil enregistre, pas de comparaison")
+        regressions = [(row, flag) for row, flag in zip(profile, flags) if flag]
+        for row, flag in regressions:
+            print(f"  [WARN] {row['TableName']}.{row['ColumnName']}: {flag}")
+        for table_name, column in missing:
+            print(f"  [WARN] {table_name}.{column}: absente de ce chargement")
+        if not previous.empty and not regressions and not missing:
+            print("  [OK] Aucune regression par rapport au chargement precedent")
+        return True
     
     def generate_summary_report(self):
         """Génère un rapport de synthèse"""
@@ -298,47 +992,79 @@ class NorthwindLoader:
         """Ferme la connexion"""
         if self.conn:
             self.conn.close()
+            self.conn = None
             print("\n[OK] Connexion fermee")
     
-    def execute_full_load(self):
-        """Exécute le processus complet de chargement"""
+    def execute_full_load(self, data=None):
+        """Exécute le processus complet de chargement
+
+        Args:
+            data: (optionnel) dict {nom_table: DataFrame} à charger directement, sans relire les CSV
+        """
         print("\n[START] DEBUT DU CHARGEMENT\n")
         
-        # 1. Connexion
+        # 1. Connexion (base fantôme)
         if not self.connect():
             return False
         
-        # 2. Charger les données
-        loaded = self.load_all_data()
-        print(f"\n[OK] {loaded} tables chargees")
-        
-        # 3. Créer les index
-        self.create_indexes()
-        
-        # 4. Créer les vues
-        self.create_views()
-        
-        # 5. Vérifier la qualité
-        self.verify_data_quality()
-        
-        # 6. Générer le rapport Excel
-        self.generate_excel_report()
-        
-        # 7. Rapport de synthèse
-        self.generate_summary_report()
+        try:
+            # 2. Charger les données
+            loaded = self.load_all_data(data)
+            print(f"\n[OK] {loaded} tables chargees")
+            
+            # 3. Créer les index
+            self.create_indexes()
+            
+            # 4. Matérialiser les vues de synthèse
+            self.materialize_views()
+            
+            # 5. Vérifier la qualité: une base incomplète n'est pas publiée
+            if not self.verify_data_quality():
+                self.discard()
+                return False
+            
+            # 6. Générer le rapport Excel
+            self.generate_excel_report(data)
+            
+            # 7. Rapport de synthèse
+            self.generate_summary_report()
+        except Exception as e:
+            print(f"[ERR] Erreur de chargement: {e}")
+            self.discard()
+            return False
         
-        # 8. Fermer
+        # 8. Fermer puis publier la base fantôme
         self.close()
+        if not self.publish():
+            return False
+        # Commandes extraites en incrémental désormais chargées
+        clear_pending_orders()
         
         print("\n[OK] CHARGEMENT TERMINE AVEC SUCCES\n")
         return True
 
 
-def main():
-    """Fonction principale"""
-    loader = NorthwindLoader()
-    loader.execute_full_load()
+def main(data=None, incremental=False):
+    """Fonction principale. `data` permet de passer les DataFrames transformés en mémoire.
+    `incremental=True` n'écrit que les lignes nouvelles / modifiées de sales_clean et des métriques."""
+    loader = NorthwindLoader(incremental=incremental)
+    loader.execute_full_load(data)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Chargement des données transformées dans SQLite")
+    parser.add_argument('--rollback', action='store_true',
+                        help="Rétablir la génération précédente de la base (data/northwind_analytics.db.prev)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Upsert des seules lignes nouvelles / modifiées de sales_clean et des métriques")
+    parser.add_argument('--publish', action='store_true',
+                        help="Publier une base fantôme conservée après un échec de publication (data/northwind_analytics.db.new)")
+    args = parser.parse_args()
+
+    if args.rollback:
+        NorthwindLoader().rollback()
+    elif args.publish:
+        NorthwindLoader().publish()
+    else:
+        main(incremental=args.incremental)
\ No newline at end of file
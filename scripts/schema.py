@@ -0,0 +1,174 @@
+"""
+Schéma de types de la vue des ventes (sales_analysis_complete -> sales_clean)
+Appliqué par l'extraction, la transformation et le chargement pour réduire l'empreinte mémoire
+"""
+
+import pandas as pd
+
+from dates import parse_dates
+
+
+# Types déclarés par colonne. Les chaînes à faible cardinalité deviennent des catégories, les
+# entiers sont réduits (types nullables: une valeur manquante ne force plus le passage en float64)
+# et les dates sont en datetime64. Les montants restent en float64 pour ne pas altérer les totaux.
+SALES_CLEAN_SCHEMA = {
+    # Identifiants. Les clés (commande, client, produit) restent en Int64: elles viennent de la
+    # source et une conversion avec perte serait ignorée, ce qui changerait silencieusement leur type
+    'OrderID': 'Int64',
+    'CustomerID': 'Int64',
+    'EmployeeID': 'Int16',
+    'ShipperID': 'Int16',
+    'ProductID': 'Int64',
+
+    # Dates
+    'OrderDate': 'datetime64[ns]',
+    'ShippedDate': 'datetime64[ns]',
+    'PaidDate': 'datetime64[ns]',
+    'SubmittedDate': 'datetime64[ns]',
+    'CreationDate': 'datetime64[ns]',
+    'InvoiceDate': 'datetime64[ns]',
+    'DueDate': 'datetime64[ns]',
+
+    # Texte répétitif
+    'EmployeeName': 'category',
+    'EmployeeTitle': 'category',
+    'EmployeeEmail': 'category',
+    'CustomerCompany': 'category',
+    'CustomerName': 'category',
+    'CustomerCountry': 'category',
+    'CustomerCity': 'category',
+    'CustomerState': 'category',
+    'ShipperCompany': 'category',
+    'ShipName': 'category',
+    'ShipAddress': 'category',
+    'ShipCity': 'category',
+    'ShipState': 'category',
+    'ShipCountry': 'category',
+    'PaymentType': 'category',
+    'Notes': 'category',
+    'TaxStatus': 'category',
+    'StatusName': 'category',
+    'ProductName': 'category',
+    'CategoryName': 'category',
+    'MonthName': 'category',
+    'AmountCategory': 'category',
+
+    # Codes postaux: identifiants (zéros en tête, codes alphanumériques), pas des nombres
+    'ShipZIP': 'category',
+    'CustomerZIP': 'category',
+
+    # Montants et taux
+    'ShippingFee': 'float64',
+    'Taxes': 'float64',
+    'TaxRate': 'float64',
+    'UnitPrice': 'float64',
+    'Discount': 'float64',
+    'LineTotal': 'float64',
+    'InvoiceTax': 'float64',
+    'InvoiceShipping': 'float64',
+    'AmountDue': 'float64',
+
+    # Quantités et composantes temporelles
+    'Quantity': 'Int32',
+    'DeliveryDays': 'Int32',
+    'OrderYear': 'Int16',
+    'OrderMonth': 'Int8',
+    'OrderQuarter': 'Int8',
+    'Year': 'Int16',
+    'Month': 'Int8',
+    'Quarter': 'Int8',
+    'DayOfWeek': 'Int8',
+    'WasShipped': 'bool',
+}
+
+
+# Colonnes à lire comme texte dans les CSV: sinon read_csv en fait des entiers (01234 -> 1234)
+CODE_COLUMNS = ['ShipZIP', 'CustomerZIP']
+
+
+def code_read_dtypes():
+    """Types à imposer à read_csv pour garder les codes postaux tels quels"""
+    return {col: 'str' for col in CODE_COLUMNS}
+
+
+def category_columns(schema=SALES_CLEAN_SCHEMA):
+    """Colonnes déclarées en catégorie (utilisable comme `dtype=` de read_csv)"""
+    return {col: 'category' for col, dtype in schema.items() if dtype == 'category'}
+
+
+def _convert(series, dtype):
+    """Convertit une colonne vers le type déclaré"""
+    if dtype.startswith('datetime64'):
+        return parse_dates(series)
+    if dtype == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if dtype == 'bool' and series.isna().any():
+        return series.astype('boolean')
+    if series.dtype == object and dtype != 'bool':
+        series = pd.to_numeric(series)
+    return series.astype(dtype)
+
+
+def apply_schema(df, schema=SALES_CLEAN_SCHEMA, verbose=True):
+    """Applique le schéma aux colonnes présentes de `df` (modifié en place et retourné).
+
+    Une colonne qui ne peut pas être convertie sans perte (ex: entier déclaré mais valeurs
+    décimales après imputation) garde son type actuel et est signalée.
+    """
+    skipped = []
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        try:
+            df[col] = _convert(df[col], dtype)
+        except (TypeError, ValueError):
+            skipped.append(col)
+    if skipped and verbose:
+        print(f"  ⚠ Schéma non appliqué (conversion avec perte) pour: {', '.join(skipped)}")
+    return df
+
+
+def memory_usage_kb(df):
+    """Empreinte mémoire réelle d'un DataFrame (chaînes comprises), en Ko"""
+    return df.memory_usage(deep=True).sum() / 1024
+
+
+def apply_schema_with_report(df, label, schema=SALES_CLEAN_SCHEMA):
+    """apply_schema + une ligne de rapport mémoire avant/après"""
+    before = memory_usage_kb(df)
+    df = apply_schema(df, schema)
+    after = memory_usage_kb(df)
+    saved = (1 - after / before) * 100 if before else 0
+    print(f"  ⚙ Schéma {label}: {before:,.1f} Ko → {after:,.1f} Ko (-{saved:.0f}%)")
+    return df
+
+
+def schema_memory_report(df, schema=SALES_CLEAN_SCHEMA):
+    """Rapport détaillé par colonne: type et mémoire avant/après application du schéma"""
+    before_types = df.dtypes.astype(str)
+    before = df.memory_usage(deep=True, index=False)
+    converted = apply_schema(df.copy(), schema, verbose=False)
+    after = converted.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'TypeAvant': before_types,
+        'TypeApres': converted.dtypes.astype(str),
+        'KoAvant': before / 1024,
+        'KoApres': after / 1024,
+    })
+    report['Gain%'] = ((1 - report['KoApres'] / report['KoAvant']) * 100).round(1)
+    return report.sort_values('KoAvant', ascending=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Rapport mémoire du schéma sales_clean")
+    parser.add_argument("path", nargs='?', default='data/processed/sales_clean.csv', help="CSV à analyser")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.path)
+    report = schema_memory_report(df)
+    print(f"\n⚙ RAPPORT MÉMOIRE DU SCHÉMA: {args.path} ({len(df):,} lignes)\n")
+    print(report.to_string(float_format=lambda v: f"{v:,.1f}"))
+    total_before, total_after = report['KoAvant'].sum(), report['KoApres'].sum()
+    print(f"\n  • Total: {total_before:,.1f} Ko → {total_after:,.1f} Ko "
+          f"(-{(1 - total_after / total_before) * 100:.0f}%)")
@@ -0,0 +1,273 @@
+"""
+Stockage des données transformées (data/processed/) au format CSV ou Parquet
+En Parquet, sales_clean est un jeu de données partitionné par Year/Month: les lecteurs ne chargent
+que les colonnes et les partitions demandées, avec les types déjà déclarés (pas de ré-analyse des dates)
+Le fichier data/state/pending_orders.json relie l'extraction incrémentale au chargement incrémental
+"""
+
+import json
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except Exception:
+    PARQUET_AVAILABLE = False  # sans pyarrow, seul le format CSV est disponible
+
+STORE_FORMATS = ('csv', 'parquet')
+
+# Jeux de données partitionnés (répertoires Year=AAAA/Month=M/) et type des colonnes de partition
+PARTITION_COLUMNS = {'sales_clean': ['Year', 'Month']}
+PARTITION_TYPES = {'Year': 'int16', 'Month': 'int8'}
+
+# Format de date fixe pour le CSV: sinon pandas omet l'heure dans les lots où toutes les dates sont à minuit
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Commandes extraites en incrémental depuis le dernier chargement publié: le chargement incrémental
+# de sales_clean ne compare que ces commandes. Fichier absent: toutes les commandes sont comparées.
+PENDING_ORDERS_FILE = 'data/state/pending_orders.json'
+
+_OPERATORS = {
+    '=': lambda s, v: s == v,
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v),
+}
+
+
+def _filter_mask(df, filters):
+    """Masque des lignes vérifiant toutes les conditions (col, op, valeur) — équivalent CSV du filtre Parquet"""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        mask &= _OPERATORS[op](df[col], value).fillna(False).astype(bool)
+    return mask
+
+
+class BatchWriter:
+    """Écriture d'un jeu de données par lots, visible seulement après commit()
+
+    Les lots sont écrits dans une copie temporaire (fichier .tmp en CSV, répertoire .tmp en
+    Parquet) qui remplace la version précédente au commit. La copie dans l'autre format est
+    supprimée pour que les lecteurs ne retrouvent pas une version périmée.
+    """
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.file_format = store.file_format
+        self.target = store.path_for(name, self.file_format)
+        self.tmp_path = f"{self.target}.tmp"
+        self.partition_cols = PARTITION_COLUMNS.get(name) if self.file_format == 'parquet' else None
+        self.schema = None
+        self.n_batches = 0
+        self._remove(self.tmp_path)
+
+    @staticmethod
+    def _remove(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _arrow_table(self, df):
+        """Table Arrow au schéma du premier lot (dictionnaires en index int32 pour unifier les lots)"""
+        if self.schema is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            fields = [pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type, f.type.ordered), f.nullable)
+                      if pa.types.is_dictionary(f.type) else f for f in table.schema]
+            self.schema = pa.schema(fields, metadata=table.schema.metadata)
+        return pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+    def write(self, df):
+        if self.file_format == 'csv':
+            df.to_csv(self.tmp_path, mode='w' if self.n_batches == 0 else 'a', header=self.n_batches == 0,
+                      index=False, encoding='utf-8', date_format=CSV_DATE_FORMAT)
+        elif self.partition_cols:
+            pq.write_to_dataset(self._arrow_table(df), self.tmp_path, partition_cols=self.partition_cols,
+                                basename_template=f"part-{self.n_batches:05d}-{{i}}.parquet")
+        else:
+            # Jeu non partitionné: un groupe de lignes par lot dans un seul fichier
+            if self.n_batches == 0:
+                self._parquet_writer = pq.ParquetWriter(self.tmp_path, self._arrow_table(df).schema)
+            self._parquet_writer.write_table(self._arrow_table(df))
+        self.n_batches += 1
+
+    def commit(self):
+        if self.n_batches == 0:
+            return None
+        if getattr(self, '_parquet_writer', None) is not None:
+            self._parquet_writer.close()
+        self._remove(self.target)
+        os.replace(self.tmp_path, self.target)
+        other = 'csv' if self.file_format == 'parquet' else 'parquet'
+        self._remove(self.store.path_for(self.name, other))
+        return self.target
+
+    def abort(self):
+        if getattr(self, '_parquet_writer', None) is not None:
+            self._parquet_writer.close()
+        self._remove(self.tmp_path)
+
+
+class ProcessedStore:
+    """Lecture / écriture des jeux de données transformés de data/processed/
+
+    `file_format` ne concerne que l'écriture: à la lecture, le format est celui du fichier présent
+    (Parquet prioritaire). `read` accepte une liste de colonnes et des filtres (col, op, valeur)
+    combinés par ET; en Parquet ils sont poussés vers le lecteur (partitions et groupes de lignes
+    ignorés), en CSV ils sont appliqués après lecture.
+    """
+
+    def __init__(self, path='data/processed/', file_format='csv'):
+        if file_format not in STORE_FORMATS:
+            raise ValueError(f"Format inconnu: {file_format} (attendu: {', '.join(STORE_FORMATS)})")
+        if file_format == 'parquet' and not PARQUET_AVAILABLE:
+            print("⚠ pyarrow non installé: les données transformées seront écrites en CSV")
+            file_format = 'csv'
+        self.path = path
+        self.file_format = file_format
+
+    def path_for(self, name, file_format):
+        return f"{self.path}{name}.{file_format}"
+
+    def stored_format(self, name):
+        """Format du jeu `name` présent sur disque ('parquet', 'csv'), ou None"""
+        if PARQUET_AVAILABLE and os.path.exists(self.path_for(name, 'parquet')):
+            return 'parquet'
+        if os.path.exists(self.path_for(name, 'csv')):
+            return 'csv'
+        return None
+
+    def exists(self, name):
+        return self.stored_format(name) is not None
+
+    def files(self):
+        """Jeux de données présents (fichiers ou répertoires .csv / .parquet)"""
+        if not os.path.exists(self.path):
+            return []
+        return sorted(f for f in os.listdir(self.path) if f.endswith(('.csv', '.parquet')))
+
+    def writer(self, name):
+        return BatchWriter(self, name)
+
+    def write(self, df, name):
+        """Écrit un DataFrame complet; retourne le chemin écrit"""
+        writer = self.writer(name)
+        try:
+            writer.write(df)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def _dataset(self, name):
+        path = self.path_for(name, 'parquet')
+        partition_cols = PARTITION_COLUMNS.get(name)
+        partitioning = None
+        if partition_cols and os.path.isdir(path):
+            partitioning = ds.partitioning(
+                pa.schema([(col, pa.from_numpy_dtype(PARTITION_TYPES[col])) for col in partition_cols]),
+                flavor='hive')
+        return ds.dataset(path, format='parquet', partitioning=partitioning)
+
+    def columns(self, name):
+        """Colonnes stockées de `name`, dans l'ordre d'origine"""
+        file_format = self.stored_format(name)
+        if file_format == 'parquet':
+            dataset = self._dataset(name)
+            pandas_meta = dataset.schema.pandas_metadata or {}
+            ordered = [c['name'] for c in pandas_meta.get('columns', []) if c['name'] in dataset.schema.names]
+            return ordered + [c for c in dataset.schema.names if c not in ordered]
+        if file_format == 'csv':
+            return list(pd.read_csv(self.path_for(name, 'csv'), nrows=0).columns)
+        return []
+
+    def read(self, name, columns=None, filters=None, **csv_kwargs):
+        """Charge `name` (seulement `columns` et les lignes vérifiant `filters`); None s'il est absent
+
+        Les colonnes demandées mais absentes du jeu sont ignorées. `csv_kwargs` est transmis à
+        read_csv (ex: dtype) lorsque le jeu est stocké en CSV.
+        """
+        file_format = self.stored_format(name)
+        if file_format is None:
+            return None
+        stored = self.columns(name)
+        if columns is not None:
+            columns = [c for c in stored if c in set(columns)]
+        filters = list(filters or [])
+
+        if file_format == 'parquet':
+            expression = pq.filters_to_expression(filters) if filters else None
+            df = self._dataset(name).to_table(columns=columns or stored, filter=expression).to_pandas()
+            return df[columns or stored]
+
+        # CSV: les colonnes de filtre sont lues puis retirées si elles n'étaient pas demandées
+        filter_cols = [col for col, _, _ in filters]
+        usecols = None if columns is None else [c for c in stored if c in set(columns) | set(filter_cols)]
+        df = pd.read_csv(self.path_for(name, 'csv'), usecols=usecols, **csv_kwargs)
+        if filters:
+            df = df[_filter_mask(df, filters)].reset_index(drop=True)
+        return df if columns is None else df[columns]
+
+
+def _read_pending_state(path):
+    """Contenu du fichier des commandes en attente ({} si absent ou illisible)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ Commandes en attente illisibles ({path}): {e}")
+        return {}
+
+
+def _write_pending_state(state, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def read_pending_orders(path=PENDING_ORDERS_FILE):
+    """OrderID des commandes modifiées en attente de chargement (liste), ou None si inconnues
+    (aucun fichier, ou toutes les commandes à comparer: voir mark_all_orders_pending)"""
+    state = _read_pending_state(path)
+    if not state or state.get('all'):
+        return None
+    return state.get('order_ids', [])
+
+
+def add_pending_orders(order_ids, path=PENDING_ORDERS_FILE):
+    """Ajoute des OrderID aux commandes en attente (cumulées jusqu'au prochain chargement publié).
+    Sans effet si toutes les commandes sont déjà à comparer."""
+    state = _read_pending_state(path)
+    if state.get('all'):
+        return
+    pending = set(state.get('order_ids', []))
+    pending.update(pd.Series(order_ids).dropna().tolist())
+    _write_pending_state({'order_ids': sorted(pending, key=str)}, path)
+
+
+def mark_all_orders_pending(path=PENDING_ORDERS_FILE):
+    """Le prochain chargement compare toutes les commandes (extraction complète, table de la vue des
+    ventes modifiée, imputation ré-ajustée), même si une extraction incrémentale suit d'ici là"""
+    _write_pending_state({'order_ids': [], 'all': True}, path)
+
+
+def clear_pending_orders(path=PENDING_ORDERS_FILE):
+    """Oublie les commandes en attente après un chargement publié (sans nouvelle extraction, le
+    chargement suivant compare tout sales_clean)"""
+    if os.path.exists(path):
+        os.remove(path)
@@ -6,13 +6,627 @@ Nettoyage, enrichissement et préparation pour l'analyse
 import pandas as pd
 import numpy as np
 import os
+import json
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dates import parse_dates
+from schema import SALES_CLEAN_SCHEMA, apply_schema, apply_schema_with_report, code_read_dtypes
+from store import ProcessedStore, mark_all_orders_pending, read_pending_orders
+
+
+# Définition déclarative des métriques agrégées: dimensions (et leur libellé en sortie),
+# mesures (colonne de sortie, colonne source, agrégation), tri et troncature éventuels.
+METRIC_DEFINITIONS = {
+    'monthly_sales': {
+        'by': ['Year', 'Month'],
+        'labels': ['Year', 'Month'],
+        'measures': [('TotalSales', 'LineTotal', 'sum'), ('NumOrders', 'OrderID', 'nunique'),
+                     ('TotalQuantity', 'Quantity', 'sum')],
+        'sort': None,
+        'head': None,
+        'message': 'Ventes mensuelles créées'
+    },
+    'category_sales': {
+        'by': ['CategoryName'],
+        'labels': ['Category'],
+        'measures': [('TotalSales', 'LineTotal', 'sum'), ('NumOrders', 'OrderID', 'nunique'),
+                     ('TotalQuantity', 'Quantity', 'sum')],
+        'sort': 'TotalSales',
+        'head': None,
+        'message': 'Ventes par catégorie créées'
+    },
+    'top_products': {
+        'by': ['ProductName'],
+        'labels': ['Product'],
+        'measures': [('TotalSales', 'LineTotal', 'sum'), ('Quantity', 'Quantity', 'sum'),
+                     ('NumOrders', 'OrderID', 'nunique')],
+        'sort': 'TotalSales',
+        'head': 20,
+        'message': 'Top produits créés'
+    },
+    'country_sales': {
+        'by': ['CustomerCountry'],
+        'labels': ['Country'],
+        'measures': [('TotalSales', 'LineTotal', 'sum'), ('NumOrders', 'OrderID', 'nunique'),
+                     ('NumCustomers', 'CustomerID', 'nunique')],
+        'sort': 'TotalSales',
+        'head': None,
+        'message': 'Ventes par pays créées'
+    },
+    'employee_sales': {
+        'by': ['EmployeeName'],
+        'labels': ['Employee'],
+        'measures': [('TotalSales', 'LineTotal', 'sum'), ('NumOrders', 'OrderID', 'nunique'),
+                     ('NumCustomers', 'CustomerID', 'nunique')],
+        'sort': 'TotalSales',
+        'head': None,
+        'message': 'Performance employés créée'
+    }
+}
+
+# Colonnes dont le nombre de valeurs distinctes alimente les KPIs
+KPI_DISTINCT_COLUMNS = {'TotalOrders': 'OrderID', 'TotalCustomers': 'CustomerID', 'TotalProducts': 'ProductID'}
+
+# Règles d'imputation par colonne cible: (nom de la règle, colonnes requises, valeurs de remplacement
+# calculées sur les seules lignes encore vides). Les règles d'une cible sont essayées dans l'ordre;
+# une cible peut s'appuyer sur une colonne imputée juste avant (ex: DueDate après InvoiceDate).
+IMPUTATION_RULES = [
+    ('TaxStatus', [
+        ('TaxStatus ← TaxRate', ['TaxRate'],
+         lambda rows: np.where(rows['TaxRate'].gt(0).fillna(False).to_numpy(dtype=bool), 'Taxable', 'Non-taxable')),
+        ('TaxStatus ← Unknown', [], lambda rows: 'Unknown'),
+    ]),
+    ('InvoiceDate', [
+        ('InvoiceDate ← OrderDate', ['OrderDate'], lambda rows: rows['OrderDate']),
+    ]),
+    ('DueDate', [
+        ('DueDate ← InvoiceDate + 30j', ['InvoiceDate'], lambda rows: rows['InvoiceDate'] + pd.Timedelta(days=30)),
+        ('DueDate ← OrderDate + 30j', ['OrderDate'], lambda rows: rows['OrderDate'] + pd.Timedelta(days=30)),
+    ]),
+    ('PaidDate', [
+        ('PaidDate ← InvoiceDate', ['InvoiceDate'], lambda rows: rows['InvoiceDate']),
+        ('PaidDate ← DueDate', ['DueDate'], lambda rows: rows['DueDate']),
+        ('PaidDate ← OrderDate + 30j', ['OrderDate'], lambda rows: rows['OrderDate'] + pd.Timedelta(days=30)),
+    ]),
+    # Date d'expédition inconnue: livraison supposée le jour de la commande (WasShipped reste False)
+    ('ShippedDate', [
+        ('ShippedDate ← OrderDate', ['OrderDate'], lambda rows: rows['OrderDate']),
+    ]),
+]
+
+# Colonnes numériques remplies par le quantile ajusté (QuantileImputer, médiane par défaut): montants,
+# taux, quantités, transporteur et délai. Les autres colonnes numériques (identifiants, composantes
+# de date, LineTotal) n'ont pas d'histogramme: une valeur manquante y prend la médiane du lot.
+MEDIAN_IMPUTED_COLUMNS = ['ShipperID', 'ShippingFee', 'Taxes', 'TaxRate', 'UnitPrice', 'Quantity', 'Discount',
+                          'InvoiceTax', 'InvoiceShipping', 'AmountDue', 'DeliveryDays']
+
+
+def apply_imputation_rules(df, rules=IMPUTATION_RULES, null_counts=None):
+    """Applique les règles d'imputation à `df` (modifié en place).
+
+    Seules les lignes vides de chaque cible sont lues et écrites: une règle est évaluée sur les
+    lignes que les règles précédentes n'ont pas remplies. Une cible catégorielle passe en object
+    (le schéma la reconvertit ensuite). `null_counts` (optionnel, colonne -> valeurs manquantes)
+    permet d'ignorer les cibles complètes et est décrémenté des valeurs remplies.
+
+    Returns:
+        dict {nom de la règle: nombre de valeurs remplies} (règles ayant rempli au moins une valeur)
+    """
+    counts = {}
+    for target, chain in rules:
+        if target not in df.columns or (null_counts is not None and not null_counts.get(target, 0)):
+            continue
+        column = df[target]
+        rows = np.flatnonzero(column.isna().to_numpy())
+        if len(rows) == 0:
+            continue
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype('object')
+        values = column.to_numpy(copy=True)
+        for name, requires, fill in chain:
+            if len(rows) == 0:
+                break
+            if any(col not in df.columns for col in requires):
+                continue
+            filled = fill({col: df[col].iloc[rows] for col in requires})
+            filled = np.full(len(rows), filled, dtype=object) if np.isscalar(filled) else np.asarray(filled)
+            ok = ~pd.isna(filled)
+            if ok.any():
+                if filled.dtype.kind in 'OUS' and values.dtype != object:
+                    # Colonne entièrement vide lue comme numérique: passe en texte, comme fillna
+                    values = values.astype(object)
+                values[rows[ok]] = filled[ok]
+                counts[name] = int(ok.sum())
+                if null_counts is not None:
+                    null_counts[target] -= counts[name]
+            rows = rows[~ok]
+        df[target] = pd.Series(values, index=df.index, name=target)
+    return counts
+
+
+class FactorizedFrame:
+    """Codes entiers des colonnes d'un DataFrame, calculés une seule fois et partagés par toutes les métriques.
+
+    pd.factorize(sort=True) donne des codes dans l'ordre trié des valeurs (celui de groupby);
+    les valeurs manquantes ont le code -1 et sont exclues, comme avec groupby(dropna=True).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._codes = {}
+        self._groups = {}
+
+    def codes(self, column):
+        """(codes par ligne, valeurs distinctes triées) d'une colonne"""
+        if column not in self._codes:
+            self._codes[column] = pd.factorize(self.df[column], sort=True)
+        return self._codes[column]
+
+    def groups(self, by):
+        """(code de groupe par ligne, -1 si une dimension manque; index des groupes observés, triés)"""
+        key = tuple(by)
+        if key not in self._groups:
+            combined = np.zeros(len(self.df), dtype='int64')
+            valid = np.ones(len(self.df), dtype=bool)
+            for column in by:
+                codes, uniques = self.codes(column)
+                combined = combined * max(len(uniques), 1) + codes
+                valid &= codes >= 0
+            observed, group_codes = np.unique(combined[valid], return_inverse=True)
+            row_groups = np.full(len(self.df), -1, dtype='int64')
+            row_groups[valid] = group_codes
+
+            # Décomposition des combinaisons observées en valeurs de chaque dimension
+            arrays = []
+            remainder = observed
+            for column in reversed(by):
+                uniques = self.codes(column)[1]
+                size = max(len(uniques), 1)
+                arrays.append(uniques.take(remainder % size))
+                remainder = remainder // size
+            arrays.reverse()
+            if len(by) == 1:
+                index = pd.Index(arrays[0], name=by[0])
+            else:
+                index = pd.MultiIndex.from_arrays(arrays, names=by)
+            self._groups[key] = (row_groups, index)
+        return self._groups[key]
+
+    def group_sum(self, by, columns):
+        """Sommes par groupe (même sommation compensée que groupby().sum(), sans re-hachage des clés)"""
+        row_groups, index = self.groups(by)
+        grouper = pd.Categorical.from_codes(row_groups, categories=np.arange(len(index)))
+        sums = self.df[columns].groupby(grouper, observed=True).sum()
+        sums.index = index.take(sums.index.to_numpy(dtype='int64'))
+        return sums
+
+    def distinct_pairs(self, by, column):
+        """Couples (groupe, valeur) distincts: (DataFrame des couples, nombre de valeurs distinctes par groupe)"""
+        row_groups, index = self.groups(by)
+        codes, uniques = self.codes(column)
+        size = max(len(uniques), 1)
+        valid = (row_groups >= 0) & (codes >= 0)
+        group_part, value_part = np.divmod(np.unique(row_groups[valid] * size + codes[valid]), size)
+        pairs = index.take(group_part).to_frame(index=False)
+        pairs[column] = uniques.take(value_part)
+        counts = pd.Series(np.bincount(group_part, minlength=len(index)), index=index)
+        return pairs, counts
+
+    def distinct_values(self, column):
+        """Valeurs distinctes non manquantes d'une colonne (triées)"""
+        return pd.Index(self.codes(column)[1])
+
+
+def _iter_values(values):
+    """Itère sur les éléments d'un ensemble ou d'un partiel vectorisé (Index, DataFrame de couples)"""
+    if isinstance(values, pd.DataFrame):
+        return zip(*(values[col].tolist() for col in values.columns))
+    if isinstance(values, pd.Index):
+        return iter(values.tolist())
+    return iter(values)
+
+
+class MetricsAccumulator:
+    """Agrégats partiels fusionnables pour les métriques de METRIC_DEFINITIONS et les KPIs.
+
+    Les sommes sont conservées par groupe et les comptages distincts sous forme d'ensembles
+    exacts de couples (groupe, valeur): fusionner deux accumulateurs donne exactement le même
+    résultat que d'agréger les deux lots ensemble. Intégrer un lot coûte O(lot) (mise à jour
+    d'ensembles/dictionnaires), la mémoire dépend du nombre de groupes/valeurs distinctes. L'état
+    peut être persisté (save/load) pour les exécutions incrémentales suivantes.
+
+    Un partiel issu d'un seul lot reste vectorisé (DataFrame/Index/Series, comptages déjà calculés);
+    les ensembles et dictionnaires ne sont construits qu'à la première fusion avec un autre lot.
+    """
+
+    def __init__(self):
+        self.sums = {}             # métrique -> DataFrame des sommes, indexé par les dimensions
+        self.distinct_pairs = {}   # (métrique, colonne) -> set de tuples (dimensions..., valeur) ou DataFrame
+        self.distinct_counts = {}  # (métrique, colonne) -> Series des comptages (partiel d'un seul lot)
+        self.kpi_distinct = {}     # colonne -> set des valeurs distinctes ou Index
+        self.revenue = None        # somme de LineTotal
+        self.order_totals = None   # dict (ou Series) OrderID -> somme de LineTotal
+        self.delivery = None       # (somme, nombre) de DeliveryDays
+        self.rows = 0
+
+    def update(self, df):
+        """Intègre un lot de données nettoyées"""
+        self.merge(self.from_frame(df))
+        return self
+
+    @classmethod
+    def from_frame(cls, df):
+        """Calcule les agrégats partiels d'un lot.
+
+        Chaque colonne utilisée (dimension ou valeur distincte) n'est factorisée qu'une fois pour
+        l'ensemble des métriques; sommes et comptages distincts travaillent ensuite sur des codes entiers.
+        """
+        partial = cls()
+        partial.rows = len(df)
+        frame = FactorizedFrame(df)
+        for name, definition in METRIC_DEFINITIONS.items():
+            by = definition['by']
+            sources = [source for _, source, _ in definition['measures']]
+            if not all(col in df.columns for col in by + sources):
+                continue
+            sum_columns = list(dict.fromkeys(source for _, source, agg in definition['measures'] if agg == 'sum'))
+            partial.sums[name] = frame.group_sum(by, sum_columns)
+            for _, source, agg in definition['measures']:
+                if agg == 'nunique':
+                    pairs, counts = frame.distinct_pairs(by, source)
+                    partial.distinct_pairs[(name, source)] = pairs
+                    partial.distinct_counts[(name, source)] = counts
+
+        if 'LineTotal' in df.columns:
+            partial.revenue = df['LineTotal'].sum()
+        for column in KPI_DISTINCT_COLUMNS.values():
+            if column in df.columns:
+                partial.kpi_distinct[column] = frame.distinct_values(column)
+        if 'OrderID' in df.columns and 'LineTotal' in df.columns:
+            partial.order_totals = frame.group_sum(['OrderID'], ['LineTotal'])['LineTotal']
+        if 'DeliveryDays' in df.columns:
+            partial.delivery = (df['DeliveryDays'].sum(), df['DeliveryDays'].count())
+        return partial
+
+    def merge(self, other):
+        """Fusionne un autre accumulateur dans celui-ci"""
+        if self.rows == 0 and not self.sums and self.revenue is None:
+            # Accumulateur vide: reprise du partiel tel quel (reste vectorisé)
+            self.__dict__.update({key: (dict(value) if isinstance(value, dict) else value)
+                                  for key, value in other.__dict__.items()})
+            return self
+        self.rows += other.rows
+        self.distinct_counts = {}
+        for name, sums in other.sums.items():
+            if name in self.sums:
+                by = METRIC_DEFINITIONS[name]['by']
+                sums = pd.concat([self.sums[name], sums]).groupby(level=by).sum()
+            self.sums[name] = sums
+        for key, pairs in other.distinct_pairs.items():
+            self.distinct_pairs[key] = self._as_set(self.distinct_pairs.get(key))
+            self.distinct_pairs[key].update(_iter_values(pairs))
+        for column, values in other.kpi_distinct.items():
+            self.kpi_distinct[column] = self._as_set(self.kpi_distinct.get(column))
+            self.kpi_distinct[column].update(_iter_values(values))
+        if other.revenue is not None:
+            self.revenue = other.revenue if self.revenue is None else self.revenue + other.revenue
+        if other.order_totals is not None:
+            if not isinstance(self.order_totals, dict):
+                self.order_totals = {} if self.order_totals is None else self.order_totals.to_dict()
+            for order_id, total in other.order_totals.items():
+                self.order_totals[order_id] = self.order_totals[order_id] + total if order_id in self.order_totals else total
+        if other.delivery is not None:
+            if self.delivery is None:
+                self.delivery = other.delivery
+            else:
+                self.delivery = (self.delivery[0] + other.delivery[0], self.delivery[1] + other.delivery[1])
+        return self
+
+    @classmethod
+    def combine(cls, partials):
+        """Fusion vectorisée de partiels issus de from_frame (ex: partitions traitées en parallèle).
+
+        Équivalent à merge() successifs, sans construire d'ensembles: couples distincts et
+        valeurs distinctes sont concaténés puis dédoublonnés, les sommes regroupées par dimensions.
+        """
+        partials = [partial for partial in partials if partial.rows] or partials[:1]
+        vectorized = all(not isinstance(values, set) and not isinstance(partial.order_totals, dict)
+                         for partial in partials
+                         for values in list(partial.distinct_pairs.values()) + list(partial.kpi_distinct.values()))
+        if len(partials) <= 1 or not vectorized:
+            combined = cls()
+            for partial in partials:
+                combined.merge(partial)
+            return combined
+
+        combined = cls()
+        combined.rows = sum(partial.rows for partial in partials)
+        for name in dict.fromkeys(name for partial in partials for name in partial.sums):
+            sums = [partial.sums[name] for partial in partials if name in partial.sums]
+            combined.sums[name] = pd.concat(sums).groupby(level=METRIC_DEFINITIONS[name]['by']).sum()
+        for key in dict.fromkeys(key for partial in partials for key in partial.distinct_pairs):
+            pairs = [partial.distinct_pairs[key] for partial in partials if key in partial.distinct_pairs]
+            combined.distinct_pairs[key] = pd.concat(pairs, ignore_index=True).drop_duplicates(ignore_index=True)
+        for column in dict.fromkeys(column for partial in partials for column in partial.kpi_distinct):
+            values = [partial.kpi_distinct[column] for partial in partials if column in partial.kpi_distinct]
+            combined.kpi_distinct[column] = values[0].append(values[1:]).unique()
+        revenues = [partial.revenue for partial in partials if partial.revenue is not None]
+        combined.revenue = sum(revenues) if revenues else None
+        totals = [partial.order_totals for partial in partials if partial.order_totals is not None]
+        if totals:
+            combined.order_totals = pd.concat(totals).groupby(level=0).sum()
+        deliveries = [partial.delivery for partial in partials if partial.delivery is not None]
+        if deliveries:
+            combined.delivery = (sum(total for total, _ in deliveries), sum(count for _, count in deliveries))
+        return combined
+
+    @staticmethod
+    def _as_set(values):
+        """Ensemble modifiable à partir d'un état absent, vectorisé ou déjà sous forme d'ensemble"""
+        if values is None:
+            return set()
+        return values if isinstance(values, set) else set(_iter_values(values))
+
+    def known_orders(self):
+        """Copie des OrderID déjà intégrés (à figer en début d'exécution incrémentale)"""
+        return set(_iter_values(self.kpi_distinct.get('OrderID', ())))
+
+    @staticmethod
+    def new_rows(df, known):
+        """Masque des lignes dont la commande (OrderID) n'est pas dans `known`"""
+        if not known or 'OrderID' not in df.columns:
+            return pd.Series(True, index=df.index)
+        return pd.Series(np.fromiter((order_id not in known for order_id in df['OrderID'].tolist()),
+                                     dtype=bool, count=len(df)), index=df.index)
+
+    def save(self, path):
+        """Persiste l'état (pickle, écriture atomique)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': 1, 'state': self.__dict__}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Recharge un état persisté par save(), ou None s'il est absent/illisible"""
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if not isinstance(payload, dict) or payload.get('version') != 1:
+            return None
+        accumulator = cls()
+        accumulator.__dict__.update(payload['state'])
+        return accumulator
+
+    def finalize(self):
+        """Produit les DataFrames de métriques (mêmes colonnes et tris que create_aggregated_metrics)"""
+        metrics = {}
+        for name, definition in METRIC_DEFINITIONS.items():
+            if name not in self.sums:
+                continue
+            by = definition['by']
+            sums = self.sums[name]
+            result = pd.DataFrame(index=sums.index)
+            for output, source, agg in definition['measures']:
+                if agg == 'sum':
+                    result[output] = sums[source]
+                elif (name, source) in self.distinct_counts:
+                    result[output] = self.distinct_counts[(name, source)].reindex(sums.index, fill_value=0)
+                else:
+                    pairs = self.distinct_pairs[(name, source)]
+                    if not isinstance(pairs, pd.DataFrame):
+                        pairs = pd.DataFrame(list(pairs), columns=by + [source])
+                    counts = pairs.groupby(by, observed=True).size()
+                    result[output] = counts.reindex(sums.index, fill_value=0)
+            result = result.reset_index()
+            result.columns = definition['labels'] + [output for output, _, _ in definition['measures']]
+            if definition['sort']:
+                result = result.sort_values(definition['sort'], ascending=False)
+            if definition['head']:
+                result = result.head(definition['head'])
+            metrics[name] = result
+
+        kpis = {}
+        if self.revenue is not None:
+            kpis['TotalRevenue'] = self.revenue
+        for kpi, column in KPI_DISTINCT_COLUMNS.items():
+            if column in self.kpi_distinct:
+                kpis[kpi] = len(self.kpi_distinct[column])
+        if self.order_totals is not None:
+            if isinstance(self.order_totals, dict):
+                kpis['AvgOrderValue'] = pd.Series(list(self.order_totals.values()), dtype='float64').mean()
+            else:
+                kpis['AvgOrderValue'] = self.order_totals.mean()
+        if self.delivery is not None:
+            total, count = self.delivery
+            kpis['AvgDeliveryDays'] = total / count if count else np.nan
+        metrics['kpis'] = pd.DataFrame([kpis])
+        return metrics
+
+
+class QuantileImputer:
+    """Valeurs d'imputation (médiane ou autre quantile) exactes sur des données lues par lots.
+
+    Un quantile ne se fusionne pas comme une somme: on conserve donc, par colonne imputée
+    (`columns`, MEDIAN_IMPUTED_COLUMNS par défaut), l'histogramme exact des valeurs non nulles
+    (valeur -> nombre d'occurrences). Les
+    histogrammes de plusieurs lots se fusionnent, et la sélection du k-ième élément sur
+    l'histogramme trié donne le même résultat que Series.median() / Series.quantile() sur
+    la colonne complète. La mémoire dépend du nombre de valeurs distinctes, pas du nombre de lignes.
+    """
+
+    def __init__(self, quantile=0.5, columns=MEDIAN_IMPUTED_COLUMNS):
+        self.quantile = quantile
+        self.columns = list(columns)
+        self.histograms = {}   # colonne -> Series (index: valeur, valeurs: occurrences)
+        self.text_columns = set()  # colonnes texte: un lot où elles sont vides ne doit pas les rendre numériques
+        self.rows = 0
+
+    def partial_fit(self, df):
+        """Ajoute les valeurs non nulles des colonnes imputées (numériques) d'un lot"""
+        self.rows += len(df)
+        self.text_columns.update(col for col in df.select_dtypes(include=['object', 'category']).columns
+                                 if df[col].notna().any())
+        numeric = df[[col for col in self.columns if col in df.columns]].select_dtypes(include=[np.number])
+        for col in numeric.columns:
+            counts = df[col].value_counts()
+            if col in self.histograms:
+                counts = self.histograms[col].add(counts, fill_value=0).astype('int64')
+            self.histograms[col] = counts
+        return self
+
+    def merge(self, other):
+        """Fusionne les histogrammes d'un autre imputer (même quantile)"""
+        self.rows += other.rows
+        self.text_columns.update(other.text_columns)
+        for col, counts in other.histograms.items():
+            if col in self.histograms:
+                counts = self.histograms[col].add(counts, fill_value=0).astype('int64')
+            self.histograms[col] = counts
+        return self
+
+    def _select(self, counts):
+        """Quantile exact (interpolation linéaire, comme pandas) à partir d'un histogramme"""
+        counts = counts[counts > 0].sort_index()
+        n = counts.sum()
+        if n == 0:
+            return np.nan
+        values = counts.index.to_numpy(dtype='float64')
+        cumulative = counts.to_numpy().cumsum()
+        position = (n - 1) * self.quantile
+        lower, upper = int(np.floor(position)), int(np.ceil(position))
+        low_value = values[np.searchsorted(cumulative, lower, side='right')]
+        high_value = values[np.searchsorted(cumulative, upper, side='right')]
+        if self.quantile == 0.5:
+            # Même arrondi que numpy.median (moyenne des deux valeurs centrales)
+            return (low_value + high_value) / 2
+        # Interpolation linéaire calculée comme numpy (depuis la borne la plus proche)
+        fraction = position - lower
+        if fraction >= 0.5:
+            return high_value - (high_value - low_value) * (1 - fraction)
+        return low_value + (high_value - low_value) * fraction
+
+    def values(self):
+        """Valeurs d'imputation par colonne (colonnes texte exclues)"""
+        return {col: self._select(counts) for col, counts in self.histograms.items() if col not in self.text_columns}
+
+    def read_dtypes(self):
+        """Types à imposer à read_csv pour que chaque lot ait les mêmes colonnes texte que le fichier complet"""
+        return {col: 'object' for col in sorted(self.text_columns)}
+
+    def save(self, path):
+        """Persiste histogrammes et valeurs (JSON) pour les exécutions suivantes"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        values = self.values()
+        state = {
+            'quantile': self.quantile,
+            'rows': int(self.rows),
+            'fitted_at': datetime.now().isoformat(timespec='seconds'),
+            'text_columns': sorted(self.text_columns),
+            'columns': {
+                col: {
+                    'value': None if pd.isna(values.get(col, np.nan)) else float(values[col]),
+                    'histogram': [[v.item() if hasattr(v, 'item') else v, int(c)] for v, c in counts.items()]
+                }
+                for col, counts in self.histograms.items()
+            }
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Recharge un état persisté par save(), ou None s'il est absent/illisible"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        imputer = cls(quantile=state.get('quantile', 0.5))
+        # État d'une version qui ajustait toutes les colonnes numériques: seules les colonnes imputées sont gardées
+        imputer.rows = state.get('rows', 0)
+        imputer.text_columns = set(state.get('text_columns', []))
+        for col, entry in state.get('columns', {}).items():
+            if col not in imputer.columns:
+                continue
+            histogram = entry.get('histogram') or []
+            imputer.histograms[col] = pd.Series([c for _, c in histogram], index=[v for v, _ in histogram],
+                                                dtype='int64')
+        return imputer
+
+
+def _fit_partition(df, quantile):
+    """Prépare une partition et ajuste ses histogrammes d'imputation (fonction de niveau module
+    pour le process pool). La partition préparée est renvoyée pour ne pas refaire les conversions."""
+    transformer = NorthwindTransformer(write_csv=False, imputation_quantile=quantile)
+    prepared = transformer.prepare_sales_data(df, inplace=True)
+    return prepared, QuantileImputer(quantile=quantile).partial_fit(prepared)
+
+
+def _clean_partition(df, impute_values, known, prepared=False):
+    """Nettoie une partition et calcule ses agrégats partiels (lignes des commandes hors `known`)"""
+    transformer = NorthwindTransformer(write_csv=False)
+    clean = transformer.clean_sales_data(df, verbose=False, impute_values=impute_values, prepared=prepared, inplace=True)
+    rows = clean[MetricsAccumulator.new_rows(clean, known)] if known else clean
+    return clean, MetricsAccumulator.from_frame(rows), len(rows), transformer.imputation_counts
+
+
+def _concat_partitions(parts):
+    """Concatène des partitions nettoyées en alignant les types qui diffèrent de l'une à l'autre.
+
+    Une colonne entière n'est passée en float64 que dans les partitions où elle avait des valeurs à
+    imputer; les catégories diffèrent d'une partition à l'autre (le schéma est réappliqué ensuite).
+    """
+    for col in parts[0].columns:
+        dtypes = [part[col].dtype for part in parts]
+        if all(dtype == dtypes[0] for dtype in dtypes[1:]):
+            continue
+        if any(pd.api.types.is_float_dtype(dtype) for dtype in dtypes):
+            target = 'float64'
+        elif all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        else:
+            target = 'object'
+        for part in parts:
+            part[col] = part[col].astype(target)
+    return pd.concat(parts)
+
 
 class NorthwindTransformer:
     """Classe pour transformer les données extraites"""
     
-    def __init__(self):
+    def __init__(self, write_csv=True, reuse_imputation=False, imputation_quantile=0.5, incremental_metrics=False,
+                 output_format='csv', workers=1, inplace=False):
         self.raw_path = 'data/raw/'
         self.processed_path = 'data/processed/'
+        # Si False, les résultats ne sont pas écrits dans data/processed/ (mode pipeline en mémoire)
+        self.write_csv = write_csv
+        # Format d'écriture de data/processed/ ('csv' ou 'parquet', sales_clean partitionné par Year/Month)
+        self.store = ProcessedStore(self.processed_path, output_format)
+        # Valeurs d'imputation numériques (quantile exact) persistées entre les exécutions
+        self.state_path = 'data/state/'
+        self.imputation_file = f"{self.state_path}imputation.json"
+        self.reuse_imputation = reuse_imputation
+        self.imputation_quantile = imputation_quantile
+        self.imputer = None
+        # État des agrégats (sommes, ensembles distincts exacts) pour les mises à jour incrémentales
+        self.metrics_state_file = f"{self.state_path}metrics_state.pkl"
+        self.incremental_metrics = incremental_metrics
+        self.metrics_state = None
+        # Nombre de valeurs remplies par règle d'imputation (cumulé sur les lots)
+        self.imputation_counts = {}
+        # Nombre de processus pour nettoyer les partitions de la vue des ventes (1: séquentiel)
+        self.workers = max(1, int(workers or 1))
+        # Nettoyage sans copie défensive de la vue reçue en paramètre (elle est alors modifiée);
+        # les données lues par le transformateur lui-même (fichier, lots, partitions) le sont toujours
+        self.inplace = inplace
         
         # Créer le dossier de sortie
         os.makedirs(self.processed_path, exist_ok=True)
@@ -20,34 +634,112 @@ class NorthwindTransformer:
     def load_raw_data(self, filename):
         """Charge un fichier CSV depuis data/raw/"""
         try:
-            df = pd.read_csv(f"{self.raw_path}{filename}")
+            df = pd.read_csv(f"{self.raw_path}{filename}", dtype=code_read_dtypes())
             print(f"✓ Chargé: {filename} ({len(df)} lignes)")
             return df
         except Exception as e:
             print(f"✗ Erreur chargement {filename}: {e}")
             return None
     
-    def clean_sales_data(self, df):
-        """Nettoie et enrichit les données de ventes"""
-        print("\n🧹 Nettoyage des données de ventes...")
-        
+    def load_imputer(self):
+        """Recharge les valeurs d'imputation persistées (None si absentes ou d'un autre quantile)"""
+        imputer = QuantileImputer.load(self.imputation_file)
+        if imputer is None or imputer.quantile != self.imputation_quantile:
+            return None
+        print(f"ℹ Valeurs d'imputation réutilisées: {self.imputation_file} ({imputer.rows:,} lignes ajustées)")
+        return imputer
+
+    def save_imputer(self):
+        """Persiste les valeurs d'imputation ajustées lors de cette exécution.
+
+        Appelée seulement quand une exécution suivante peut s'en servir: avec --reuse-imputation (état
+        absent, donc ajusté ici) ou en mode par lots (la passe d'ajustement peut alors être évitée).
+        """
+        if self.imputer is None or not self.write_csv:
+            return
+        try:
+            self.imputer.save(self.imputation_file)
+            print(f"✓ Valeurs d'imputation sauvegardées: {self.imputation_file}")
+        except Exception as e:
+            print(f"⚠ Impossible de sauvegarder les valeurs d'imputation: {e}")
+
+    def invalidate_pending_orders(self):
+        """Après un ré-ajustement de l'imputation (sans --reuse-imputation, ou état absent), des lignes de
+        commandes non modifiées peuvent changer: le prochain chargement incrémental compare tout"""
+        if self.imputer is None or read_pending_orders() is None:
+            return
+        mark_all_orders_pending()
+        print("ℹ Valeurs d'imputation ré-ajustées: le prochain chargement incrémental compare toutes les commandes")
+
+    def start_metrics_state(self):
+        """Accumulateur de départ et commandes déjà intégrées.
+
+        En mode incrémental, l'état persisté est repris et seules les lignes des commandes absentes
+        de l'état y sont ajoutées. Une commande déjà intégrée ne peut pas être retirée de l'état
+        (sommes et ensembles distincts): si l'extraction incrémentale signale une commande modifiée
+        déjà intégrée, ou si les commandes modifiées sont inconnues (extraction complète), les
+        agrégats sont recalculés en entier.
+        """
+        if self.incremental_metrics:
+            accumulator = MetricsAccumulator.load(self.metrics_state_file)
+            if accumulator is None:
+                print("ℹ Aucun état d'agrégats persisté: calcul complet")
+                return MetricsAccumulator(), set()
+            known = accumulator.known_orders()
+            pending = read_pending_orders()
+            modified = [order_id for order_id in pending if order_id in known] if pending is not None else None
+            if modified is None:
+                print("ℹ Commandes modifiées inconnues (extraction complète): agrégats recalculés en entier")
+            elif modified:
+                print(f"ℹ {len(modified):,} commande(s) déjà intégrée(s) modifiée(s): agrégats recalculés en entier")
+            else:
+                print(f"↻ Agrégats incrémentaux: état repris ({len(known):,} commandes, {accumulator.rows:,} lignes)")
+                return accumulator, known
+        return MetricsAccumulator(), set()
+
+    def save_metrics_state(self):
+        """Persiste l'état des agrégats pour la prochaine exécution incrémentale.
+
+        Sans --incremental-metrics, l'état n'est pas écrit et un état précédent est supprimé: il ne
+        suivrait plus les commandes modifiées entre-temps.
+        """
+        if self.metrics_state is None or not self.write_csv:
+            return
+        try:
+            if not self.incremental_metrics:
+                if os.path.exists(self.metrics_state_file):
+                    os.remove(self.metrics_state_file)
+                    print(f"ℹ État des agrégats supprimé (calcul complet): {self.metrics_state_file}")
+                return
+            self.metrics_state.save(self.metrics_state_file)
+            print(f"✓ État des agrégats sauvegardé: {self.metrics_state_file}")
+        except Exception as e:
+            print(f"⚠ Impossible de sauvegarder l'état des agrégats: {e}")
+
+    def fit_imputer(self, batches):
+        """Première passe du mode par lots: ajuste le quantile exact de chaque colonne numérique"""
+        imputer = QuantileImputer(quantile=self.imputation_quantile)
+        for batch in batches:
+            imputer.partial_fit(self.prepare_sales_data(batch, inplace=True))
+        print(f"⚙ Valeurs d'imputation ajustées sur {imputer.rows:,} lignes ({len(imputer.histograms)} colonnes)")
+        return imputer
+
+    def prepare_sales_data(self, df, inplace=False):
+        """Conversions et colonnes dérivées précédant l'imputation des valeurs manquantes
+
+        Args:
+            inplace: True pour modifier `df` directement au lieu d'une copie (l'appelant ne s'en sert plus)
+        """
         # Copie pour ne pas modifier l'original
-        df_clean = df.copy()
+        df_clean = df if inplace else df.copy()
         
-        # 1. Convertir les dates
-        date_columns = ['OrderDate', 'ShippedDate', 'PaidDate', 'SubmittedDate', 'CreationDate']
+        # 1. Convertir les dates (format détecté une fois par colonne, chaînes répétées analysées une fois)
+        date_columns = ['OrderDate', 'ShippedDate', 'PaidDate', 'SubmittedDate', 'CreationDate',
+                        'InvoiceDate', 'DueDate']
         for col in date_columns:
             if col in df_clean.columns:
                 try:
-                    df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
-                except:
-                    print(f"  ⚠ Impossible de convertir la colonne {col}")
-
-        # Also parse invoice/due dates if present
-        for col in ['InvoiceDate', 'DueDate']:
-            if col in df_clean.columns:
-                try:
-                    df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
+                    df_clean[col] = parse_dates(df_clean[col], source=col)
                 except:
                     print(f"  ⚠ Impossible de convertir la colonne {col}")
         
@@ -57,7 +749,9 @@ class NorthwindTransformer:
             df_clean['Month'] = df_clean['OrderDate'].dt.month
             df_clean['Quarter'] = df_clean['OrderDate'].dt.quarter
             df_clean['DayOfWeek'] = df_clean['OrderDate'].dt.dayofweek
-            df_clean['MonthName'] = df_clean['OrderDate'].dt.strftime('%B')
+            # Nom du mois (%B, locale courante) formaté 12 fois puis associé au numéro de mois
+            month_names = {month: datetime(2000, month, 1).strftime('%B') for month in range(1, 13)}
+            df_clean['MonthName'] = df_clean['Month'].map(month_names)
         
         # 3. Calculer le délai de livraison (si les dates existent)
         if 'ShippedDate' in df_clean.columns and 'OrderDate' in df_clean.columns:
@@ -77,72 +771,94 @@ class NorthwindTransformer:
                 bins=[0, 100, 500, 1000, float('inf')],
                 labels=['Petit', 'Moyen', 'Grand', 'Très Grand']
             )
+
+        return df_clean
+
+    def clean_sales_data(self, df, verbose=True, impute_values=None, prepared=False, inplace=False):
+        """Nettoie et enrichit les données de ventes
+
+        Les valeurs manquantes sont comptées une seule fois (recensement par colonne), puis ce
+        recensement est tenu à jour par chaque remplissage: seules les colonnes incomplètes sont
+        traitées, et le délai de livraison n'est recalculé que pour les lignes dont une date a été imputée.
+
+        Args:
+            verbose: False pour ne rien afficher (mode par lots)
+            impute_values: (optionnel) valeurs de remplissage numériques déjà ajustées (colonne -> valeur).
+                Si None, le quantile exact de chaque colonne est calculé sur `df` et conservé dans self.imputer
+            prepared: True si `df` sort déjà de prepare_sales_data (il est alors modifié en place)
+            inplace: True pour nettoyer `df` sans copie défensive (`df` est modifié, l'appelant ne
+                doit plus l'utiliser); réduit le pic mémoire d'une copie complète du DataFrame
+        """
+        if verbose:
+            print("\n🧹 Nettoyage des données de ventes...")
+
+        df_clean = df if prepared else self.prepare_sales_data(df, inplace=inplace)
         
-        # 5. Gérer les valeurs manquantes
-        missing_before = df_clean.isnull().sum().sum()
-        
-        # Remplir les valeurs numériques
+        # 5. Gérer les valeurs manquantes (recensement unique, mis à jour par les remplissages)
+        null_counts = df_clean.isnull().sum().to_dict()
+        missing_before = sum(null_counts.values())
+
+        # Remplir les valeurs numériques (médiane par défaut)
+        if impute_values is None:
+            self.imputer = QuantileImputer(quantile=self.imputation_quantile).partial_fit(df_clean)
+            impute_values = self.imputer.values()
         numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
         for col in numeric_cols:
-            if df_clean[col].isnull().any():
-                df_clean[col] = df_clean[col].fillna(df_clean[col].median())
+            if null_counts[col]:
+                # Colonne absente de l'ajustement: médiane locale; colonne entièrement vide: rien à remplir
+                fill_value = impute_values[col] if col in impute_values else df_clean[col].median()
+                if pd.notna(fill_value):
+                    if pd.api.types.is_integer_dtype(df_clean[col]) and not float(fill_value).is_integer():
+                        df_clean[col] = df_clean[col].astype('float64')
+                    df_clean[col] = df_clean[col].fillna(fill_value)
+                    null_counts[col] = 0
+        
+        # Règles d'imputation (TaxStatus depuis TaxRate, dates de repli) sur les seules lignes vides
+        # (après l'imputation de TaxRate, avant le remplissage générique 'Inconnu')
+        rule_counts = apply_imputation_rules(df_clean, null_counts=null_counts)
+        for name, count in rule_counts.items():
+            self.imputation_counts[name] = self.imputation_counts.get(name, 0) + count
         
-        # Remplir les valeurs catégorielles
-        categorical_cols = df_clean.select_dtypes(include=['object']).columns
+        # Remplir les valeurs catégorielles (AmountCategory, dérivée de LineTotal, reste telle quelle)
+        categorical_cols = df_clean.select_dtypes(include=['object', 'category']).columns.drop('AmountCategory', errors='ignore')
         for col in categorical_cols:
-            if df_clean[col].isnull().any():
+            if null_counts[col]:
+                if isinstance(df_clean[col].dtype, pd.CategoricalDtype) and 'Inconnu' not in df_clean[col].cat.categories:
+                    df_clean[col] = df_clean[col].cat.add_categories('Inconnu')
                 df_clean[col] = df_clean[col].fillna('Inconnu')
+                null_counts[col] = 0
         
-        missing_after = df_clean.isnull().sum().sum()
+        missing_after = sum(null_counts.values())
 
         # Additional targeted imputations for important columns
         # Notes: replace NaN with a clear placeholder so CSV -> DB keeps a value
-        if 'Notes' in df_clean.columns:
+        if 'Notes' in df_clean.columns and null_counts['Notes']:
             df_clean['Notes'] = df_clean['Notes'].fillna('Inconnu')
 
-        # TaxStatus: if missing, infer from TaxRate (Taxable / Non-taxable)
-        if 'TaxStatus' in df_clean.columns:
-            if 'TaxRate' in df_clean.columns:
-                df_clean['TaxStatus'] = df_clean['TaxStatus'].fillna(
-                    df_clean['TaxRate'].apply(lambda x: 'Taxable' if pd.notnull(x) and x > 0 else 'Non-taxable')
-                )
-            else:
-                df_clean['TaxStatus'] = df_clean['TaxStatus'].fillna('Unknown')
-
-        # InvoiceDate: if missing, fallback to OrderDate
-        if 'InvoiceDate' in df_clean.columns and 'OrderDate' in df_clean.columns:
-            df_clean['InvoiceDate'] = df_clean['InvoiceDate'].fillna(df_clean['OrderDate'])
-
-        # DueDate: if missing, try to infer from InvoiceDate, otherwise set to OrderDate + 30 days
-        if 'DueDate' in df_clean.columns:
-            if 'InvoiceDate' in df_clean.columns:
-                df_clean['DueDate'] = df_clean['DueDate'].fillna(df_clean['InvoiceDate'] + pd.Timedelta(days=30))
-            # second fallback: use OrderDate
-            if 'OrderDate' in df_clean.columns:
-                df_clean['DueDate'] = df_clean['DueDate'].fillna(df_clean['OrderDate'] + pd.Timedelta(days=30))
-
-        # PaidDate: if missing, try InvoiceDate then DueDate then OrderDate + 30
-        if 'PaidDate' in df_clean.columns:
-            if 'InvoiceDate' in df_clean.columns:
-                df_clean['PaidDate'] = df_clean['PaidDate'].fillna(df_clean['InvoiceDate'])
-            if 'DueDate' in df_clean.columns:
-                df_clean['PaidDate'] = df_clean['PaidDate'].fillna(df_clean['DueDate'])
-            if 'OrderDate' in df_clean.columns:
-                df_clean['PaidDate'] = df_clean['PaidDate'].fillna(df_clean['OrderDate'] + pd.Timedelta(days=30))
-
-        # ShippedDate: if missing, fallback to OrderDate (assume 0 days delivery when unknown)
-        if 'ShippedDate' in df_clean.columns and 'OrderDate' in df_clean.columns:
-            df_clean['ShippedDate'] = df_clean['ShippedDate'].fillna(df_clean['OrderDate'])
-
-        # Recompute DeliveryDays after imputations
+        # Recompute DeliveryDays after imputations: seules les lignes sans date d'expédition
+        # d'origine (WasShipped False, ShippedDate imputée) ou sans date de commande peuvent changer
         if 'ShippedDate' in df_clean.columns and 'OrderDate' in df_clean.columns:
-            df_clean['DeliveryDays'] = (df_clean['ShippedDate'] - df_clean['OrderDate']).dt.days
+            rows = ~df_clean['WasShipped'].to_numpy(dtype=bool) | df_clean['OrderDate'].isna().to_numpy()
+            if rows.any():
+                delivery = (df_clean['ShippedDate'][rows] - df_clean['OrderDate'][rows]).dt.days
+                if pd.api.types.is_integer_dtype(df_clean['DeliveryDays']) and delivery.isna().any():
+                    df_clean['DeliveryDays'] = df_clean['DeliveryDays'].astype('float64')
+                df_clean.loc[rows, 'DeliveryDays'] = delivery.to_numpy()
         
-        print(f"  • Dates converties")
-        print(f"  • Composantes temporelles ajoutées")
-        if 'DeliveryDays' in df_clean.columns:
-            print(f"  • Délais de livraison calculés")
-        print(f"  • Valeurs manquantes: {missing_before} → {missing_after}")
+        if verbose:
+            print(f"  • Dates converties")
+            print(f"  • Composantes temporelles ajoutées")
+            if 'DeliveryDays' in df_clean.columns:
+                print(f"  • Délais de livraison calculés")
+            print(f"  • Valeurs manquantes: {missing_before} → {missing_after}")
+            for name, count in rule_counts.items():
+                print(f"    - {name}: {count} valeur(s)")
+
+        # 6. Types déclarés (catégories, entiers réduits, dates)
+        if verbose:
+            df_clean = apply_schema_with_report(df_clean, 'sales_clean')
+        else:
+            df_clean = apply_schema(df_clean, SALES_CLEAN_SCHEMA, verbose=False)
         
         return df_clean
     
@@ -150,108 +866,199 @@ class NorthwindTransformer:
         """Crée des métriques agrégées pour le dashboard"""
         print("\n📊 Création des métriques agrégées...")
         
-        metrics = {}
-        
-        # 1. Ventes par mois (si les colonnes existent)
-        if all(col in df.columns for col in ['Year', 'Month', 'LineTotal', 'OrderID', 'Quantity']):
-            monthly_sales = df.groupby(['Year', 'Month']).agg({
-                'LineTotal': 'sum',
-                'OrderID': 'nunique',
-                'Quantity': 'sum'
-            }).reset_index()
-            monthly_sales.columns = ['Year', 'Month', 'TotalSales', 'NumOrders', 'TotalQuantity']
-            metrics['monthly_sales'] = monthly_sales
-            print(f"  • Ventes mensuelles créées")
-        
-        # 2. Ventes par catégorie (si CategoryName existe)
-        if 'CategoryName' in df.columns:
-            category_sales = df.groupby('CategoryName').agg({
-                'LineTotal': 'sum',
-                'OrderID': 'nunique',
-                'Quantity': 'sum'
-            }).reset_index()
-            category_sales.columns = ['Category', 'TotalSales', 'NumOrders', 'TotalQuantity']
-            category_sales = category_sales.sort_values('TotalSales', ascending=False)
-            metrics['category_sales'] = category_sales
-            print(f"  • Ventes par catégorie créées")
-        
-        # 3. Top produits (si ProductName existe)
-        if 'ProductName' in df.columns:
-            product_sales = df.groupby('ProductName').agg({
-                'LineTotal': 'sum',
-                'Quantity': 'sum',
-                'OrderID': 'nunique'
-            }).reset_index()
-            product_sales.columns = ['Product', 'TotalSales', 'Quantity', 'NumOrders']
-            product_sales = product_sales.sort_values('TotalSales', ascending=False).head(20)
-            metrics['top_products'] = product_sales
-            print(f"  • Top produits créés")
-        
-        # 4. Ventes par pays (si CustomerCountry existe)
-        if 'CustomerCountry' in df.columns:
-            country_sales = df.groupby('CustomerCountry').agg({
-                'LineTotal': 'sum',
-                'OrderID': 'nunique',
-                'CustomerID': 'nunique'
-            }).reset_index()
-            country_sales.columns = ['Country', 'TotalSales', 'NumOrders', 'NumCustomers']
-            country_sales = country_sales.sort_values('TotalSales', ascending=False)
-            metrics['country_sales'] = country_sales
-            print(f"  • Ventes par pays créées")
-        
-        # 5. Performance des employés (si EmployeeName existe)
-        if 'EmployeeName' in df.columns:
-            employee_sales = df.groupby('EmployeeName').agg({
-                'LineTotal': 'sum',
-                'OrderID': 'nunique',
-                'CustomerID': 'nunique'
-            }).reset_index()
-            employee_sales.columns = ['Employee', 'TotalSales', 'NumOrders', 'NumCustomers']
-            employee_sales = employee_sales.sort_values('TotalSales', ascending=False)
-            metrics['employee_sales'] = employee_sales
-            print(f"  • Performance employés créée")
-        
-        # 6. KPIs globaux
-        kpis = {}
-        
-        if 'LineTotal' in df.columns:
-            kpis['TotalRevenue'] = df['LineTotal'].sum()
-        
-        if 'OrderID' in df.columns:
-            kpis['TotalOrders'] = df['OrderID'].nunique()
-        
-        if 'CustomerID' in df.columns:
-            kpis['TotalCustomers'] = df['CustomerID'].nunique()
-        
-        if 'ProductID' in df.columns:
-            kpis['TotalProducts'] = df['ProductID'].nunique()
-        
-        if 'OrderID' in df.columns and 'LineTotal' in df.columns:
-            order_totals = df.groupby('OrderID')['LineTotal'].sum()
-            kpis['AvgOrderValue'] = order_totals.mean()
-        
-        if 'DeliveryDays' in df.columns:
-            kpis['AvgDeliveryDays'] = df['DeliveryDays'].mean()
-        
-        metrics['kpis'] = pd.DataFrame([kpis])
+        accumulator, known = self.start_metrics_state()
+        if known:
+            new = MetricsAccumulator.new_rows(df, known)
+            print(f"  • {int(new.sum()):,} nouvelles lignes intégrées sur {len(df):,}")
+            if new.any():
+                accumulator.update(df[new])
+        else:
+            accumulator.update(df)
+        return self.finalize_metrics(accumulator)
+
+    def finalize_metrics(self, accumulator):
+        """Conserve l'état des agrégats et produit les DataFrames de métriques"""
+        self.metrics_state = accumulator
+        metrics = accumulator.finalize()
+        for name, definition in METRIC_DEFINITIONS.items():
+            if name in metrics:
+                print(f"  • {definition['message']}")
         print(f"  • KPIs créés")
         
         print(f"  • Total: {len(metrics)} ensembles de métriques créés")
         
         return metrics
     
-    def save_transformed_data(self, df, filename):
-        """Sauvegarde les données transformées"""
-        output_path = f"{self.processed_path}{filename}"
-        df.to_csv(output_path, index=False, encoding='utf-8')
+    def transform_parallel(self, sales_df, impute_values=None):
+        """Nettoyage et agrégats en parallèle: la vue des ventes est découpée en `workers` partitions
+        (hachage de OrderID: les lignes d'une commande restent ensemble), nettoyées dans un process pool.
+
+        Comme en mode par lots, les valeurs d'imputation sont des quantiles exacts sur l'ensemble
+        des lignes: les histogrammes des partitions sont ajustés puis fusionnés avant le nettoyage
+        (sauf si `impute_values` est fourni). Les agrégats partiels sont combinés (MetricsAccumulator),
+        et les partitions nettoyées sont réassemblées dans l'ordre d'origine des lignes.
+
+        Returns:
+            (sales_clean, metrics)
+        """
+        key = sales_df['OrderID'] if 'OrderID' in sales_df.columns else pd.Series(np.arange(len(sales_df)))
+        partition = (pd.util.hash_pandas_object(key, index=False).to_numpy() % self.workers).astype(np.int64)
+        positions = [np.flatnonzero(partition == i) for i in range(self.workers)]
+        positions = [rows for rows in positions if len(rows)] or [np.arange(len(sales_df))]
+        parts = [sales_df.iloc[rows] for rows in positions]
+
+        print(f"\n🧹 Nettoyage des données de ventes ({len(parts)} partitions, {self.workers} processus)...")
+        accumulator, known = self.start_metrics_state()
+        prepared = False
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(parts))) as pool:
+            if impute_values is None:
+                imputer = QuantileImputer(quantile=self.imputation_quantile)
+                fitted = list(pool.map(_fit_partition, parts, [self.imputation_quantile] * len(parts)))
+                for _, partial in fitted:
+                    imputer.merge(partial)
+                self.imputer = imputer
+                impute_values = imputer.values()
+                parts = [part for part, _ in fitted]
+                prepared = True
+            results = list(pool.map(_clean_partition, parts, [impute_values] * len(parts), [known] * len(parts),
+                                    [prepared] * len(parts)))
+
+        order = np.argsort(np.concatenate(positions), kind='stable')
+        sales_clean = _concat_partitions([clean for clean, _, _, _ in results]).iloc[order]
+        sales_clean = apply_schema(sales_clean, SALES_CLEAN_SCHEMA, verbose=False)
+        for _, _, _, counts in results:
+            for name, count in counts.items():
+                self.imputation_counts[name] = self.imputation_counts.get(name, 0) + count
+        print(f"  • {len(sales_clean):,} lignes nettoyées")
+        for name, count in self.imputation_counts.items():
+            print(f"    - {name}: {count} valeur(s)")
+
+        print("\n📊 Création des métriques agrégées...")
+        if known:
+            new_rows = sum(n for _, _, n, _ in results)
+            print(f"  • {new_rows:,} nouvelles lignes intégrées sur {len(sales_clean):,}")
+        accumulator.merge(MetricsAccumulator.combine([partial for _, partial, _, _ in results]))
+        return sales_clean, self.finalize_metrics(accumulator)
+
+    def save_transformed_data(self, df, name):
+        """Sauvegarde les données transformées (au format du stockage: CSV ou Parquet)"""
+        output_path = self.store.write(df, name)
         print(f"✓ Sauvegardé: {output_path}")
     
-    def transform_all(self):  # NOTE: This is the correct method name
-        """Pipeline complet de transformation"""
+    def transform_streaming(self, filename, chunksize):
+        """Transformation par lots de `chunksize` lignes: chaque lot est nettoyé, ajouté à
+        sales_clean.csv puis intégré aux agrégats partiels. La mémoire reste bornée par la taille
+        d'un lot (plus les agrégats, proportionnels au nombre de groupes).
+
+        En Parquet, chaque lot est ajouté au jeu partitionné par Year/Month.
+
+        Les valeurs d'imputation numériques étant des quantiles exacts sur tout le fichier, une
+        première passe les ajuste (QuantileImputer) avant la passe de nettoyage, sauf si des
+        valeurs persistées sont réutilisées (reuse_imputation=True).
+
+        Returns:
+            (None, metrics), ou (None, None) si le fichier est introuvable
+        """
+        source = f"{self.raw_path}{filename}"
+        if not os.path.exists(source):
+            print(f"✗ Fichier introuvable: {source}")
+            return None, None
+
+        print(f"↻ Lecture par lots de {chunksize:,} lignes: {filename}")
+        imputer = self.load_imputer() if self.reuse_imputation else None
+        if imputer is None:
+            imputer = self.fit_imputer(pd.read_csv(source, chunksize=chunksize, dtype=code_read_dtypes()))
+            self.imputer = imputer
+        impute_values = imputer.values()
+
+        print("\n🧹 Nettoyage des données de ventes (par lots)...")
+        writer = self.store.writer('sales_clean') if self.write_csv else None
+        accumulator, known = self.start_metrics_state()
+        new_rows = 0
+        total_rows = 0
+        n_batches = 0
+        columns = []
+        date_min = date_max = None
+        try:
+            for batch in pd.read_csv(source, chunksize=chunksize, dtype={**imputer.read_dtypes(), **code_read_dtypes()}):
+                batch_clean = self.clean_sales_data(batch, verbose=False, impute_values=impute_values, inplace=True)
+                if writer is not None:
+                    writer.write(batch_clean)
+                if known:
+                    new = MetricsAccumulator.new_rows(batch_clean, known)
+                    if new.any():
+                        accumulator.update(batch_clean[new])
+                    new_rows += int(new.sum())
+                else:
+                    accumulator.update(batch_clean)
+                    new_rows += len(batch_clean)
+                if 'OrderDate' in batch_clean.columns:
+                    batch_min, batch_max = batch_clean['OrderDate'].min(), batch_clean['OrderDate'].max()
+                    date_min = batch_min if date_min is None or batch_min < date_min else date_min
+                    date_max = batch_max if date_max is None or batch_max > date_max else date_max
+                columns = list(batch_clean.columns)
+                total_rows += len(batch_clean)
+                n_batches += 1
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+
+        print(f"  • {total_rows:,} lignes nettoyées en {n_batches} lot(s)")
+
+        print("\n📊 Création des métriques agrégées...")
+        if known:
+            print(f"  • {new_rows:,} nouvelles lignes intégrées sur {total_rows:,}")
+        self.metrics_state = accumulator
+        metrics = accumulator.finalize()
+        print(f"  • Total: {len(metrics)} ensembles de métriques créés")
+
+        if self.write_csv:
+            print("\n💾 Sauvegarde des données transformées...")
+            output_path = writer.commit()
+            if output_path:
+                print(f"✓ Sauvegardé: {output_path}")
+            for key, df in metrics.items():
+                self.save_transformed_data(df, key)
+            self.save_imputer()
+            self.save_metrics_state()
+        self.invalidate_pending_orders()
+
+        self.stream_stats = {'rows': total_rows, 'columns': columns, 'batches': n_batches,
+                             'date_min': date_min, 'date_max': date_max}
+        self.print_summary(None, metrics)
+
+        print("\n✅ TRANSFORMATION TERMINÉE\n")
+
+        return None, metrics
+
+    def transform_all(self, sales_df=None, chunksize=None):  # NOTE: This is the correct method name
+        """Pipeline complet de transformation
+
+        Args:
+            sales_df: (optionnel) vue analytique des ventes déjà en mémoire (ex: retournée par
+                l'extracteur). Si None, elle est lue depuis data/raw/sales_analysis_complete.csv
+            chunksize: (optionnel) si renseigné et sales_df est None, le CSV brut est traité par
+                lots (voir transform_streaming) et sales_clean n'est pas retourné
+
+        Avec workers > 1 (hors mode par lots), nettoyage et agrégats sont calculés par partitions
+        dans un process pool (voir transform_parallel).
+        """
         print("\n🚀 DÉBUT DE LA TRANSFORMATION\n")
+
+        if sales_df is None and chunksize:
+            for filename in ['sales_analysis_complete.csv', 'sales_analysis.csv']:
+                if os.path.exists(f"{self.raw_path}{filename}"):
+                    return self.transform_streaming(filename, chunksize)
+            print("✗ Aucune donnée disponible pour la transformation")
+            return None, None
         
-        # 1. Charger les données brutes
-        sales_df = self.load_raw_data('sales_analysis_complete.csv')
+        # 1. Charger les données brutes (une vue lue ici peut être nettoyée sans copie)
+        inplace = self.inplace or sales_df is None
+        if sales_df is not None:
+            print(f"✓ Données reçues en mémoire ({len(sales_df)} lignes)")
+        else:
+            sales_df = self.load_raw_data('sales_analysis_complete.csv')
         if sales_df is None:
             print("✗ Impossible de charger les données")
             print("⚠ Essayez d'abord de charger sales_analysis.csv")
@@ -261,17 +1068,30 @@ class NorthwindTransformer:
                 return None, None
         
         # 2. Nettoyer et enrichir
-        sales_clean = self.clean_sales_data(sales_df)
+        impute_values = None
+        if self.reuse_imputation:
+            imputer = self.load_imputer()
+            impute_values = imputer.values() if imputer is not None else None
+        if self.workers > 1:
+            # 2-3. Partitions nettoyées et agrégées en parallèle
+            sales_clean, metrics = self.transform_parallel(sales_df, impute_values)
+        else:
+            sales_clean = self.clean_sales_data(sales_df, impute_values=impute_values, inplace=inplace)
         
-        # 3. Créer les métriques agrégées
-        metrics = self.create_aggregated_metrics(sales_clean)
+            # 3. Créer les métriques agrégées
+            metrics = self.create_aggregated_metrics(sales_clean)
         
         # 4. Sauvegarder tout
-        print("\n💾 Sauvegarde des données transformées...")
-        self.save_transformed_data(sales_clean, 'sales_clean.csv')
-        
-        for key, df in metrics.items():
-            self.save_transformed_data(df, f'{key}.csv')
+        if self.write_csv:
+            print("\n💾 Sauvegarde des données transformées...")
+            self.save_transformed_data(sales_clean, 'sales_clean')
+            
+            for key, df in metrics.items():
+                self.save_transformed_data(df, key)
+            if self.reuse_imputation:
+                self.save_imputer()
+            self.save_metrics_state()
+        self.invalidate_pending_orders()
         
         # 5. Résumé
         self.print_summary(sales_clean, metrics)
@@ -287,11 +1107,19 @@ class NorthwindTransformer:
         print("="*60)
         
         print(f"\n📊 Données nettoyées:")
-        print(f"  • Lignes: {len(df):,}")
-        print(f"  • Colonnes: {len(df.columns)}")
-        
-        if 'OrderDate' in df.columns:
-            print(f"  • Période: {df['OrderDate'].min()} à {df['OrderDate'].max()}")
+        if df is None:
+            # Mode par lots: statistiques accumulées pendant le flux
+            stats = self.stream_stats
+            print(f"  • Lignes: {stats['rows']:,} ({stats['batches']} lots)")
+            print(f"  • Colonnes: {len(stats['columns'])}")
+            if 'OrderDate' in stats['columns']:
+                print(f"  • Période: {stats['date_min']} à {stats['date_max']}")
+        else:
+            print(f"  • Lignes: {len(df):,}")
+            print(f"  • Colonnes: {len(df.columns)}")
+
+            if 'OrderDate' in df.columns:
+                print(f"  • Période: {df['OrderDate'].min()} à {df['OrderDate'].max()}")
         
         if 'kpis' in metrics:
             kpis = metrics['kpis'].iloc[0]
@@ -312,26 +1140,45 @@ class NorthwindTransformer:
             if 'AvgDeliveryDays' in kpis:
                 print(f"  • Délai livraison moyen: {kpis['AvgDeliveryDays']:.1f} jours")
         
-        print(f"\n📁 Fichiers générés dans {self.processed_path}:")
-        if os.path.exists(self.processed_path):
-            files = os.listdir(self.processed_path)
-            for f in sorted(files):
-                if f.endswith('.csv'):
-                    print(f"  • {f}")
+        if self.imputation_counts:
+            print(f"\n🧩 Imputations par règle:")
+            for name, count in self.imputation_counts.items():
+                print(f"  • {name}: {count:,}")
+        
+        if not self.write_csv:
+            print(f"\n📁 Mode en mémoire: aucun fichier écrit dans {self.processed_path}")
+        elif os.path.exists(self.processed_path):
+            print(f"\n📁 Fichiers générés dans {self.processed_path}:")
+            for f in self.store.files():
+                print(f"  • {f}")
         
         print("="*60)
 
 
-def main():
-    """Fonction principale"""
+def main(sales_df=None, write_csv=True, chunksize=None, reuse_imputation=False, incremental_metrics=False,
+         output_format='csv', workers=1, inplace=False):
+    """Fonction principale
+
+    Args:
+        sales_df: (optionnel) DataFrame des ventes brutes déjà en mémoire, sinon lu depuis data/raw/
+        write_csv: si False, aucun CSV n'est écrit dans data/processed/
+        chunksize: (optionnel) traiter data/raw/ par lots de N lignes (mémoire bornée)
+        reuse_imputation: réutiliser les valeurs d'imputation persistées dans data/state/ au lieu de les ré-ajuster
+        incremental_metrics: reprendre l'état persisté des agrégats et n'y ajouter que les nouvelles commandes
+        output_format: format de data/processed/ ('csv' ou 'parquet', partitionné par Year/Month)
+        workers: nombre de processus pour nettoyer et agréger la vue des ventes par partitions (hors mode par lots)
+        inplace: nettoyer `sales_df` sans copie défensive (il est modifié; à réserver à un appelant qui ne le réutilise pas)
+    """
     print("\n" + "="*60)
     print("TRANSFORMATEUR DE DONNÉES NORTHWIND")
     print("="*60)
     
-    transformer = NorthwindTransformer()
+    transformer = NorthwindTransformer(write_csv=write_csv, reuse_imputation=reuse_imputation,
+                                       incremental_metrics=incremental_metrics, output_format=output_format,
+                                       workers=workers, inplace=inplace)
     
     try:
-        sales_clean, metrics = transformer.transform_all()
+        sales_clean, metrics = transformer.transform_all(sales_df=sales_df, chunksize=chunksize)
         print("\n✓ Transformation terminée avec succès!")
         return sales_clean, metrics
     except Exception as e:
@@ -342,4 +1189,19 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Transformation des données Northwind")
+    parser.add_argument("--chunksize", type=int, default=None, help="Traiter le CSV brut par lots de N lignes")
+    parser.add_argument("--reuse-imputation", action="store_true",
+                        help="Réutiliser les valeurs d'imputation persistées (data/state/imputation.json) sans nouvel ajustement")
+    parser.add_argument("--incremental-metrics", action="store_true",
+                        help="Mettre à jour l'état persisté des agrégats avec les seules nouvelles commandes")
+    parser.add_argument("--format", dest="output_format", choices=['csv', 'parquet'], default='csv',
+                        help="Format de data/processed/ (parquet: sales_clean partitionné par Year/Month)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nettoyer et agréger la vue des ventes en N partitions parallèles (processus)")
+    args = parser.parse_args()
+    if args.workers > 1 and args.chunksize:
+        parser.error("--workers est incompatible avec --chunksize")
+    main(chunksize=args.chunksize, reuse_imputation=args.reuse_imputation, incremental_metrics=args.incremental_metrics,
+         output_format=args.output_format, workers=args.workers)
\ No newline at end of file
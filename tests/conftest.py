@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les scripts s'importent entre eux comme modules de premier niveau (exécutés depuis scripts/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
@@ -0,0 +1,38 @@
+import pandas as pd
+import pandas.testing as tm
+
+from dates import DateParser
+
+
+def test_mixed_formats_in_one_column():
+    parser = DateParser()
+    values = pd.Series(['2006-01-15 10:30:00', '2006-01-16', '01/17/2006', 'pas une date', None, '2006-01-16'],
+                       name='OrderDate')
+
+    parsed = parser.parse(values, source='OrderDate')
+
+    expected = pd.Series([pd.Timestamp('2006-01-15 10:30:00'), pd.Timestamp('2006-01-16'), pd.Timestamp('2006-01-17'),
+                          pd.NaT, pd.NaT, pd.Timestamp('2006-01-16')], name='OrderDate')
+    tm.assert_series_equal(parsed, expected)
+    assert parser.formats['OrderDate'] is None  # pas de format unique pour cette source
+
+
+def test_format_redetected_when_a_batch_changes_format():
+    parser = DateParser()
+
+    first = parser.parse(pd.Series(['2006-02-01', '2006-02-02']), source='ShippedDate')
+    assert parser.formats['ShippedDate'] == '%Y-%m-%d'
+    second = parser.parse(pd.Series(['03/04/2006 08:00:00', '2006-02-01']), source='ShippedDate')
+
+    assert first.tolist() == [pd.Timestamp('2006-02-01'), pd.Timestamp('2006-02-02')]
+    # Valeur déjà vue servie par le cache, nouvelle valeur analysée avec le format re-détecté
+    assert second.tolist() == [pd.Timestamp('2006-03-04 08:00:00'), pd.Timestamp('2006-02-01')]
+    assert parser.formats['ShippedDate'] == '%m/%d/%Y %H:%M:%S'
+
+
+def test_matches_to_datetime_on_non_string_columns():
+    parser = DateParser()
+    values = pd.Series([pd.Timestamp('2006-01-01'), None], dtype='object')
+
+    tm.assert_series_equal(parser.parse(values), pd.to_datetime(values, errors='coerce'))
+    tm.assert_series_equal(parser.parse(pd.Series([None, None])), pd.to_datetime(pd.Series([None, None])))
@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pandas.testing as tm
+
+import extract
+from benchmark_simulation import compare_lines_per_order, simulate_order_details_loop
+from extract import NorthwindExtractor, simulate_order_details
+from store import clear_pending_orders, read_pending_orders
+
+
+def make_products(n=20):
+    """Catalogue synthétique au format attendu par simulate_order_details"""
+    return pd.DataFrame({
+        'ProductID': range(1, n + 1),
+        'ProductName': [f'Produit {i}' for i in range(1, n + 1)],
+        'CategoryName': [f'Catégorie {i % 4}' for i in range(1, n + 1)],
+        'UnitPrice': [1.5 * i for i in range(1, n + 1)],
+    })
+
+
+def order_lines(details, order_id):
+    return details[details['OrderID'] == order_id].reset_index(drop=True)
+
+
+def test_simulate_order_details_same_lines_alone_or_in_batch():
+    products = make_products()
+    batch = list(range(1, 501))
+    details = simulate_order_details(batch, products)
+
+    for order_id in (1, 42, 250, 500):
+        alone = simulate_order_details([order_id], products)
+        tm.assert_frame_equal(alone, order_lines(details, order_id))
+
+
+def test_simulate_order_details_independent_of_batch_order():
+    products = make_products()
+    details = simulate_order_details(list(range(1, 201)), products)
+    reversed_details = simulate_order_details(list(range(200, 0, -1)), products)
+
+    for order_id in (1, 100, 200):
+        tm.assert_frame_equal(order_lines(reversed_details, order_id), order_lines(details, order_id))
+
+
+def test_simulate_order_details_same_lines_across_calls():
+    products = make_products()
+    order_ids = [10, 11, 12, 'A-7', 'B-8']
+
+    first = simulate_order_details(order_ids, products)
+    second = simulate_order_details(order_ids, products)
+
+    tm.assert_frame_equal(first, second)
+    assert set(first['OrderID']) == set(order_ids)
+    assert first.groupby('OrderID').size().between(1, 3).all()
+
+
+def test_simulate_order_details_same_lines_per_order_distribution_as_loop():
+    products = make_products()
+    orders = pd.DataFrame({'OrderID': range(1, 3001)})
+
+    loop_details = simulate_order_details_loop(orders, products)
+    numpy_details = simulate_order_details(orders['OrderID'], products)
+
+    assert compare_lines_per_order(loop_details, numpy_details, len(orders))
+    # Contrôle du contrôle: une loi différente (toujours une ligne) est détectée
+    single_line = numpy_details.drop_duplicates('OrderID')
+    assert not compare_lines_per_order(loop_details, single_line, len(orders))
+
+
+def make_orders(n=8):
+    """Table Orders minimale: commandes 1 à n, expédiées et payées sauf la 3 (non payée)"""
+    dates = pd.Timestamp('2006-01-10') + pd.to_timedelta(range(n), unit='D')
+    paid = pd.Series(dates + pd.Timedelta(days=2))
+    paid[2] = pd.NaT
+    return pd.DataFrame({
+        'Order ID': range(1, n + 1),
+        'Customer': [f'Company {i}' for i in range(1, n + 1)],
+        'Order Date': dates,
+        'Shipped Date': dates + pd.Timedelta(days=1),
+        'Paid Date': paid,
+        'Shipping Fee': [5] * n,
+    })
+
+
+def extract_orders(db_path):
+    """Une exécution incrémentale de l'extraction des commandes (nouvel extracteur, comme un nouveau run)"""
+    extractor = NorthwindExtractor(source='sql', db_conn_string=f'sqlite:///{db_path}', use_cache=False,
+                                   incremental=True)
+    return extractor.extract_incremental('orders', 'Orders.xlsx')
+
+
+def set_fee(db_path, order_id, fee):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('UPDATE orders SET "Shipping Fee" = ? WHERE "Order ID" = ?', (fee, order_id))
+
+
+def test_incremental_orders_detects_edits_below_watermark(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(extract, 'INCREMENTAL_REREAD_WINDOW', 2)
+    db_path = tmp_path / 'src.db'
+    with sqlite3.connect(db_path) as conn:
+        make_orders().to_sql('orders', conn, index=False)
+    extract_orders(db_path)
+    assert read_pending_orders() is None  # extraction initiale: toutes les commandes à comparer
+    clear_pending_orders()  # chargement publié
+
+    # Relecture sans modification: aucune ligne ne doit paraître modifiée
+    extract_orders(db_path)
+    assert '0 nouvelles/modifiées' in capsys.readouterr().out
+    assert read_pending_orders() == []
+
+    # Commande 7: dans la fenêtre des dernières clés; commande 3: hors fenêtre mais non payée
+    set_fee(db_path, 7, 12)
+    set_fee(db_path, 3, 9)
+    orders = extract_orders(db_path).set_index('Order ID')
+
+    assert orders.loc[7, 'Shipping Fee'] == 12
+    assert orders.loc[3, 'Shipping Fee'] == 9
+    assert orders.loc[1, 'Shipping Fee'] == 5
+    assert read_pending_orders() == [3, 7]
+    raw = pd.read_csv('data/raw/orders.csv').set_index('Order ID')
+    assert raw.loc[[3, 7], 'Shipping Fee'].tolist() == [9, 12]
+
+
+def write_workbook(folder, rows, mtime):
+    """Écrit Customers.xlsx avec `rows` clients et fixe sa date de modification"""
+    path = folder / 'Customers.xlsx'
+    pd.DataFrame({'ID': range(1, rows + 1), 'Company': [f'Company {i}' for i in range(1, rows + 1)]}).to_excel(
+        path, index=False)
+    os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def excel_extractor(folder, use_cache=True):
+    return NorthwindExtractor(data_folder=f'{folder}/', use_cache=use_cache)
+
+
+def test_workbook_parsed_once_per_run_and_reparsed_after_mtime_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_workbook(tmp_path, 3, mtime=1_000_000_000_000_000_000)
+    extractor = excel_extractor(tmp_path, use_cache=False)
+
+    first = extractor.load_excel_file('Customers.xlsx')
+    first['Extra'] = 1  # l'appelant modifie sa copie, pas l'entrée du cache
+    second = extractor.load_excel_file('Customers.xlsx')
+    assert extractor.cache_stats['misses'] == 1 and extractor.cache_stats['memory_hits'] == 1
+    assert 'Extra' not in second.columns
+
+    # Classeur réécrit pendant l'exécution: l'entrée de l'ancien mtime n'est plus servie
+    write_workbook(tmp_path, 5, mtime=1_000_000_001_000_000_000)
+    assert len(extractor.load_excel_file('Customers.xlsx')) == 5
+    assert extractor.cache_stats['misses'] == 2
+
+
+def test_disk_cache_entry_invalidated_by_source_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = write_workbook(tmp_path, 3, mtime=1_000_000_000_000_000_000)
+    excel_extractor(tmp_path).load_excel_file('Customers.xlsx')
+
+    extractor = excel_extractor(tmp_path)
+    assert len(extractor.load_excel_file('Customers.xlsx')) == 3
+    assert extractor.cache_stats['disk_hits'] == 1
+
+    # Fichier touché sans changement de contenu: toujours servi par le cache, mtime mis à jour
+    os.utime(path, ns=(1_000_000_002_000_000_000,) * 2)
+    extractor = excel_extractor(tmp_path)
+    extractor.load_excel_file('Customers.xlsx')
+    assert extractor.cache_stats['disk_hits'] == 1
+    with open('data/cache/manifest.json', encoding='utf-8') as f:
+        assert json.load(f)['customers']['mtime_ns'] == 1_000_000_002_000_000_000
+
+    # Contenu modifié: l'entrée périmée est ignorée et remplacée
+    write_workbook(tmp_path, 5, mtime=1_000_000_003_000_000_000)
+    extractor = excel_extractor(tmp_path)
+    assert len(extractor.load_excel_file('Customers.xlsx')) == 5
+    assert extractor.cache_stats['disk_hits'] == 0 and extractor.cache_stats['misses'] == 1
+    assert len(excel_extractor(tmp_path).load_excel_file('Customers.xlsx')) == 5
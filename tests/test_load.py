@@ -0,0 +1,158 @@
+import sqlite3
+
+import pandas as pd
+
+import load
+from load import NorthwindLoader
+from store import add_pending_orders, mark_all_orders_pending
+
+
+def make_sales_clean(n_orders=4, fee=5.0):
+    """sales_clean minimal: deux lignes par commande, colonnes des tables de synthèse comprises"""
+    rows = []
+    for order_id in range(1, n_orders + 1):
+        for product_id in (1, 2):
+            rows.append({'OrderID': order_id, 'ProductID': product_id, 'Year': 2006, 'Month': order_id,
+                         'ProductName': f'Produit {product_id}', 'CategoryName': 'Boissons',
+                         'CustomerID': order_id % 2 + 1, 'CustomerName': f'Company {order_id % 2}',
+                         'CustomerCountry': 'USA', 'Quantity': product_id, 'ShippingFee': fee,
+                         'LineTotal': 10.0 * order_id + product_id})
+    return pd.DataFrame(rows)
+
+
+def build_generation(db_path, df, incremental=False):
+    """Construit la base fantôme (sales_clean seule) sans la publier; retourne le loader fermé"""
+    loader = NorthwindLoader(output_db=str(db_path), incremental=incremental)
+    assert loader.connect()
+    loader.load_table(df, 'sales_clean')
+    loader.close()
+    return loader
+
+
+def read_sales(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql('SELECT * FROM sales_clean ORDER BY OrderID, ProductID', conn)
+
+
+def edit_orders(df, order_ids, fee):
+    df = df.copy()
+    df.loc[df['OrderID'].isin(order_ids), 'ShippingFee'] = fee
+    return df
+
+
+def test_incremental_upsert_compares_only_pending_orders(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean()).publish()
+
+    # Commande 2 signalée par l'extraction; la commande 4 modifiée sans l'être n'est pas comparée
+    add_pending_orders([2])
+    assert build_generation(db_path, edit_orders(make_sales_clean(), [2, 4], 7.5), incremental=True).publish()
+
+    fees = read_sales(db_path).groupby('OrderID')['ShippingFee'].first()
+    assert fees.to_dict() == {1: 5.0, 2: 7.5, 3: 5.0, 4: 5.0}
+
+
+def test_incremental_upsert_compares_all_orders_when_marked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean()).publish()
+
+    # Table jointe modifiée ou imputation ré-ajustée: toutes les commandes sont comparées
+    add_pending_orders([2])
+    mark_all_orders_pending()
+    add_pending_orders([3])
+    edited = edit_orders(make_sales_clean(n_orders=3), [2, 1], 7.5)
+    assert build_generation(db_path, edited, incremental=True).publish()
+
+    sales = read_sales(db_path)
+    assert sales.drop(columns=['LineSeq', 'RowHash']).equals(edited)
+    assert sales.groupby('OrderID')['ShippingFee'].first().to_dict() == {1: 7.5, 2: 7.5, 3: 5.0}
+
+
+def test_publish_keeps_previous_generation_and_rollback_restores_it(tmp_path):
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean(n_orders=2)).publish()
+
+    loader = build_generation(db_path, make_sales_clean(n_orders=3))
+    # Base fantôme construite à côté: la base en place est encore la première génération
+    assert (tmp_path / 'analytics.db.new').exists()
+    assert len(read_sales(db_path)) == 4
+    assert loader.publish()
+
+    assert len(read_sales(db_path)) == 6
+    assert len(read_sales(tmp_path / 'analytics.db.prev')) == 4
+    assert not (tmp_path / 'analytics.db.new').exists()
+    assert not (tmp_path / 'analytics.db.replaced').exists()
+
+    assert NorthwindLoader(output_db=str(db_path)).rollback()
+    assert len(read_sales(db_path)) == 4
+    # La génération remplacée par le retour arrière devient à son tour .prev
+    assert len(read_sales(tmp_path / 'analytics.db.prev')) == 6
+
+
+def test_failed_publish_keeps_live_base_and_shadow(tmp_path, monkeypatch):
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean(n_orders=2)).publish()
+    assert build_generation(db_path, make_sales_clean(n_orders=3)).publish()
+    loader = build_generation(db_path, make_sales_clean(n_orders=4))
+
+    def locked(src, dst, attempts=load.REPLACE_ATTEMPTS, delay=load.REPLACE_DELAY):
+        raise PermissionError(f"{dst} est ouvert")
+    monkeypatch.setattr(load, '_replace_db', locked)
+    assert not loader.publish()
+
+    assert len(read_sales(db_path)) == 6
+    assert len(read_sales(tmp_path / 'analytics.db.prev')) == 4
+    assert len(read_sales(tmp_path / 'analytics.db.new')) == 8
+    assert not (tmp_path / 'analytics.db.replaced').exists()
+
+
+def test_rollback_without_previous_generation(tmp_path):
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean()).publish()
+    (tmp_path / 'analytics.db.prev').unlink(missing_ok=True)
+
+    assert not NorthwindLoader(output_db=str(db_path)).rollback()
+    assert len(read_sales(db_path)) == 8
+
+
+def profile_generation(db_path, df, load_id):
+    """Charge sales_clean dans une base fantôme et la vérifie; retourne (loader ouvert, résultat)"""
+    loader = NorthwindLoader(output_db=str(db_path))
+    assert loader.connect()
+    loader.load_id = load_id  # deux chargements dans la même seconde auraient le même LoadID
+    loader.load_table(df, 'sales_clean')
+    return loader, loader.verify_data_quality()
+
+
+def test_profile_flags_regressions_against_previous_load(tmp_path, capsys):
+    db_path = tmp_path / 'analytics.db'
+    loader, ok = profile_generation(db_path, make_sales_clean(n_orders=4), '2006-01-01 00:00:00')
+    assert ok
+    loader.close()
+    assert loader.publish()
+
+    # Moins de lignes, ShippingFee à moitié vide, une colonne disparue
+    df = make_sales_clean(n_orders=3).drop(columns=['Quantity'])
+    df.loc[df['OrderID'] <= 2, 'ShippingFee'] = None
+    loader, ok = profile_generation(db_path, df, '2006-01-02 00:00:00')
+    assert ok  # les régressions sont signalées, pas bloquantes
+
+    flags = pd.read_sql("SELECT ColumnName, Regression FROM dq_profile WHERE LoadID = '2006-01-02 00:00:00' "
+                        "AND Regression IS NOT NULL", loader.conn).set_index('ColumnName')['Regression']
+    loader.close()
+    assert flags.to_dict() == {'*': 'lignes 8 -> 6', 'ShippingFee': 'nulls 0.0% -> 66.7%'}
+    assert 'sales_clean.Quantity: absente de ce chargement' in capsys.readouterr().out
+
+
+def test_failed_quality_check_blocks_publish(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = tmp_path / 'analytics.db'
+    assert build_generation(db_path, make_sales_clean()).publish()
+
+    data = {'sales_clean': make_sales_clean().iloc[:0]}
+    assert not NorthwindLoader(output_db=str(db_path)).execute_full_load(data)
+
+    assert len(read_sales(db_path)) == 8
+    assert not (tmp_path / 'analytics.db.new').exists()
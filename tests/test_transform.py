@@ -0,0 +1,60 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from transform import NorthwindTransformer
+
+
+def make_sales(n=50_000, seed=0):
+    """Vue des ventes synthétique (colonnes de sales_analysis_complete.csv), avec valeurs manquantes"""
+    rng = np.random.default_rng(seed)
+    order_dates = pd.Timestamp('2006-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    shipped_dates = order_dates + pd.to_timedelta(rng.integers(1, 10, n), unit='D')
+    df = pd.DataFrame({
+        'OrderID': rng.integers(1, n // 2, n),
+        'CustomerID': rng.integers(1, 30, n),
+        'CustomerName': rng.choice(['Company A', 'Company B', 'Company C'], n).astype(object),
+        'CustomerCountry': rng.choice(['USA', 'France', None], n).astype(object),
+        'OrderDate': order_dates.strftime('%Y-%m-%d %H:%M:%S'),
+        'ShippedDate': shipped_dates.strftime('%Y-%m-%d %H:%M:%S'),
+        'ProductID': rng.integers(1, 40, n),
+        'ProductName': rng.choice(['Chai', 'Chang', 'Aniseed Syrup'], n).astype(object),
+        'CategoryName': rng.choice(['Beverages', 'Condiments'], n).astype(object),
+        'UnitPrice': rng.uniform(1, 100, n).round(2),
+        'Quantity': rng.integers(1, 11, n),
+        'Discount': rng.choice([0.0, 0.05, 0.1], n),
+        'ShippingFee': rng.uniform(0, 50, n).round(2),
+    })
+    df['LineTotal'] = df['UnitPrice'] * df['Quantity'] * (1 - df['Discount'])
+    missing = rng.random(n) < 0.1
+    df.loc[missing, 'ShippedDate'] = None
+    df.loc[rng.random(n) < 0.05, 'ShippingFee'] = np.nan
+    return df
+
+
+def clean_peak(df, inplace, tmp_path, monkeypatch):
+    """Nettoie `df` et retourne (résultat, pic mémoire alloué pendant le nettoyage)"""
+    monkeypatch.chdir(tmp_path)
+    transformer = NorthwindTransformer(write_csv=False)
+    tracemalloc.start()
+    try:
+        result = transformer.clean_sales_data(df, verbose=False, inplace=inplace)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_clean_sales_data_inplace_same_result_lower_peak(tmp_path, monkeypatch):
+    source = make_sales()
+
+    copied, copy_peak = clean_peak(source, False, tmp_path, monkeypatch)
+    # Le mode par copie ne modifie pas la vue reçue
+    tm.assert_frame_equal(source, make_sales())
+
+    inplace, inplace_peak = clean_peak(make_sales(), True, tmp_path, monkeypatch)
+
+    tm.assert_frame_equal(inplace, copied)
+    assert inplace_peak < copy_peak